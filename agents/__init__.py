@@ -5,6 +5,8 @@ Multi-Agent System Package
 from .base_agent import BaseAgent, AgentResult, Message
 from .code_interpreter import CodeInterpreterAgent
 from .answer_synthesiser import AnswerSynthesiserAgent
+from .llm_client import LLMClient
+from .llm_backends import LLMBackend, GeminiBackend, StubBackend
 
 # Import your custom agents here
 # from .your_custom_agent import YourCustomAgent
@@ -15,4 +17,8 @@ __all__ = [
     "Message",
     "CodeInterpreterAgent",
     "AnswerSynthesiserAgent",
+    "LLMClient",
+    "LLMBackend",
+    "GeminiBackend",
+    "StubBackend",
 ]
@@ -5,15 +5,25 @@ Answer Synthesiser Agent - Simple agent that provides final answers
 import google.generativeai as genai
 from typing import Dict, Any, List
 from .base_agent import BaseAgent, AgentResult
+from .llm_client import LLMClient
+from .token_budget import TokenBudget, truncate_middle
 
 
 class AnswerSynthesiserAgent(BaseAgent):
     """Simple agent that synthesizes final answers for users"""
 
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        prompt_token_budget: int = 8000,
+        max_output_tokens: int = 1500,
+    ):
         super().__init__(name="AnswerSynthesiser", api_key=api_key)
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel("gemini-2.5-flash")
+        self.llm = LLMClient("gemini-2.5-flash")
+        # Upper bound for the whole prompt, and for any single code output in it
+        self.prompt_token_budget = prompt_token_budget
+        self.max_output_tokens = max_output_tokens
 
     def get_capabilities(self) -> List[str]:
         return [
@@ -30,8 +40,15 @@ class AnswerSynthesiserAgent(BaseAgent):
         prompt = self._build_prompt(query, context)
 
         try:
-            response = self.model.generate_content(prompt)
-            response_text = response.text
+            if input_data.get("emit"):
+                # Stream tokens to the client as they arrive
+                chunks = []
+                async for chunk in self.llm.stream(prompt):
+                    chunks.append(chunk)
+                    await self.emit(input_data, "answer_token", {"text": chunk})
+                response_text = "".join(chunks)
+            else:
+                response_text = await self.llm.generate(prompt)
 
             return AgentResult(
                 success=True,
@@ -56,20 +73,29 @@ class AnswerSynthesiserAgent(BaseAgent):
 
         if has_code_results:
             ci_data = context.get("codeinterpreter_data", {})
-            prompt = f"""You are an AI assistant. Based on the analysis results, provide a clear answer.
+            budget = TokenBudget(self.prompt_token_budget)
+            budget.add(
+                "header",
+                f"""You are an AI assistant. Based on the analysis results, provide a clear answer.
 
 User Query: {query}
 
 Analysis Results:
-"""
+""",
+                required=True,
+            )
             if ci_data.get("analysis"):
-                prompt += f"{ci_data['analysis']}\n\n"
+                budget.add("analysis", f"{ci_data['analysis']}\n\n", priority=2)
             if ci_data.get("results"):
-                for result in ci_data["results"]:
+                for index, result in enumerate(ci_data["results"]):
                     if result.get("output"):
-                        prompt += f"{result['output']}\n"
+                        # Computed numbers matter most, so outputs get priority
+                        output = truncate_middle(result["output"], self.max_output_tokens)
+                        budget.add(f"output_{index}", f"{output}\n", priority=1)
 
-            prompt += """
+            budget.add(
+                "instructions",
+                """
 Instructions:
 1. Provide a clear, user-friendly answer
 2. Use markdown formatting
@@ -77,7 +103,10 @@ Instructions:
 4. Be conversational and easy to understand
 
 Provide your answer:
-"""
+""",
+                required=True,
+            )
+            prompt = budget.render()
         else:
             prompt = f"""You are a helpful AI assistant. Answer the user's question clearly.
 
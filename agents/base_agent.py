@@ -64,6 +64,8 @@ class BaseAgent(ABC):
                 - query: str - The user's query
                 - context: Dict - Context from previous agents
                 - files: Dict - Uploaded files (filename -> filepath)
+                - emit: optional async callback for streaming progress
+                  events (use self.emit() rather than calling it directly)
 
         Returns:
             AgentResult with success, data, message, and optionally next_agent
@@ -78,6 +80,31 @@ class BaseAgent(ABC):
         """
         pass
 
+    async def emit(self, input_data: Dict[str, Any], event: str, data: Dict[str, Any]):
+        """Send a progress event to a streaming client, if there is one"""
+        emit = input_data.get("emit")
+        if emit is not None:
+            await emit(event, {"agent": self.name, **data})
+
+    def startup(self):
+        """Called once when the server starts (e.g. to start worker processes)"""
+        pass
+
+    def shutdown(self):
+        """Called once when the server stops"""
+        pass
+
+    def end_session(self, session_id: str):
+        """
+        Release any state kept for a session.
+        Override this if your agent stores per-session data.
+        """
+        pass
+
+    def active_sessions(self) -> List[str]:
+        """Sessions this agent holds state for (override with end_session)"""
+        return []
+
     def add_to_history(self, message: Message):
         """Add a message to conversation history"""
         self.conversation_history.append(message)
@@ -0,0 +1,317 @@
+"""
+Chunked Tables - Out-of-core access to uploaded files
+
+A ChunkedTable reads its file in chunks (record batches of the
+memory-mapped Arrow sidecar when there is one, pd.read_csv chunks
+otherwise) instead of loading it whole. Filters and column selections
+are lazy: they are applied to each chunk as it streams past, and
+aggregations are computed incrementally, so memory use depends on the
+chunk size and the size of the result, not on the size of the file.
+
+    sales.query("region == 'EU'").groupby("month").agg({"amount": "sum"})
+    sales.describe(["amount"])
+    sales.head(10)
+"""
+
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+import numpy as np
+import pandas as pd
+
+from .columnar import feather, has_fresh_sidecar, sidecar_path
+from .dataset_profile import DatasetProfile, _clip, build_profile
+
+
+DEFAULT_CHUNK_ROWS = 100_000
+
+# Partial statistics needed by each aggregation
+_AGG_PARTS = {
+    "sum": ("sum",),
+    "count": ("count",),
+    "mean": ("sum", "count"),
+    "min": ("min",),
+    "max": ("max",),
+}
+
+# How partial statistics from different chunks are combined
+_COMBINE = {"sum": "sum", "count": "sum", "min": "min", "max": "max"}
+
+
+class ChunkedTable:
+    """Lazily evaluated table that streams a file chunk by chunk"""
+
+    def __init__(
+        self,
+        path: str,
+        chunk_rows: int = DEFAULT_CHUNK_ROWS,
+        ops: Optional[List[Callable[[pd.DataFrame], pd.DataFrame]]] = None,
+        columns: Optional[List[str]] = None,
+    ):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self._ops = ops or []
+        self._columns = columns
+
+    def __repr__(self) -> str:
+        return f"ChunkedTable({self.path!r}, columns={self.columns})"
+
+    # ----- lazy transformations -----
+
+    def _derive(self, op=None, columns=None) -> "ChunkedTable":
+        ops = self._ops + [op] if op is not None else self._ops
+        return ChunkedTable(self.path, self.chunk_rows, ops, columns or self._columns)
+
+    def query(self, expr: str) -> "ChunkedTable":
+        """Keep the rows matching a DataFrame.query() expression"""
+        return self._derive(op=lambda chunk: chunk.query(expr))
+
+    def filter(self, predicate: Callable[[pd.DataFrame], Any]) -> "ChunkedTable":
+        """Keep the rows where predicate(chunk) is True (a boolean Series)"""
+        return self._derive(op=lambda chunk: chunk[predicate(chunk)])
+
+    def select(self, columns: Union[str, List[str]]) -> "ChunkedTable":
+        if isinstance(columns, str):
+            columns = [columns]
+        return self._derive(columns=list(columns))
+
+    def __getitem__(self, columns: Union[str, List[str]]) -> "ChunkedTable":
+        return self.select(columns)
+
+    # ----- reading -----
+
+    @property
+    def columns(self) -> List[str]:
+        if self._columns is not None:
+            return list(self._columns)
+        return list(self.head(0).columns)
+
+    def chunks(self) -> Iterator[pd.DataFrame]:
+        """Yield the table's chunks, with filters and column selection applied"""
+        # Without row filters only the selected columns need to be read
+        read_columns = self._columns if not self._ops else None
+        for chunk in self._read(read_columns):
+            for op in self._ops:
+                chunk = op(chunk)
+            if self._columns is not None:
+                chunk = chunk[self._columns]
+            yield chunk
+
+    def _read(self, columns: Optional[List[str]]) -> Iterator[pd.DataFrame]:
+        if feather is not None and has_fresh_sidecar(self.path):
+            table = feather.read_table(
+                str(sidecar_path(self.path)), columns=columns, memory_map=True
+            )
+            for batch in table.to_batches(max_chunksize=self.chunk_rows):
+                yield batch.to_pandas()
+            return
+        yield from pd.read_csv(self.path, usecols=columns, chunksize=self.chunk_rows)
+
+    def head(self, n: int = 5) -> pd.DataFrame:
+        parts = []
+        remaining = n
+        for chunk in self.chunks():
+            parts.append(chunk.iloc[:remaining])
+            remaining -= len(parts[-1])
+            if remaining <= 0:
+                break
+        return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+    def collect(self, max_rows: int = 1_000_000) -> pd.DataFrame:
+        """Materialize the (filtered) table; refuses results over max_rows"""
+        parts = []
+        rows = 0
+        for chunk in self.chunks():
+            rows += len(chunk)
+            if rows > max_rows:
+                raise MemoryError(
+                    f"Result has more than {max_rows} rows; filter or aggregate it first"
+                )
+            parts.append(chunk)
+        return pd.concat(parts, ignore_index=True) if parts else self.head(0)
+
+    # ----- incremental aggregations -----
+
+    def __len__(self) -> int:
+        return sum(len(chunk) for chunk in self.chunks())
+
+    def count(self) -> pd.Series:
+        """Non-null values per column"""
+        return self._reduce(lambda chunk: chunk.count(), "sum")
+
+    def sum(self, numeric_only: bool = True) -> pd.Series:
+        return self._reduce(lambda chunk: chunk.sum(numeric_only=numeric_only), "sum")
+
+    def min(self, numeric_only: bool = True) -> pd.Series:
+        return self._reduce(lambda chunk: chunk.min(numeric_only=numeric_only), "min")
+
+    def max(self, numeric_only: bool = True) -> pd.Series:
+        return self._reduce(lambda chunk: chunk.max(numeric_only=numeric_only), "max")
+
+    def mean(self) -> pd.Series:
+        totals = self._reduce(lambda chunk: chunk.sum(numeric_only=True), "sum")
+        counts = self._reduce(lambda chunk: chunk.select_dtypes("number").count(), "sum")
+        return totals / counts
+
+    def value_counts(self, column: str, top: Optional[int] = None) -> pd.Series:
+        counts = self._reduce(lambda chunk: chunk[column].value_counts(), "sum")
+        counts = counts.sort_values(ascending=False).astype("int64")
+        return counts.head(top) if top else counts
+
+    def describe(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """count/mean/std/min/max of numeric columns, in one pass"""
+        stats: Dict[str, List[float]] = {}
+        for chunk in self.chunks():
+            numeric = chunk.select_dtypes("number")
+            if columns is not None:
+                numeric = numeric[[c for c in columns if c in numeric.columns]]
+            for name in numeric.columns:
+                values = numeric[name].dropna().to_numpy(dtype="float64")
+                if len(values) == 0:
+                    continue
+                n_b, mean_b = len(values), values.mean()
+                m2_b = ((values - mean_b) ** 2).sum()
+                if name not in stats:
+                    stats[name] = [n_b, mean_b, m2_b, values.min(), values.max()]
+                    continue
+                # Chan et al. parallel update of count, mean and M2
+                n_a, mean_a, m2_a, low, high = stats[name]
+                n = n_a + n_b
+                delta = mean_b - mean_a
+                stats[name] = [
+                    n,
+                    mean_a + delta * n_b / n,
+                    m2_a + m2_b + delta**2 * n_a * n_b / n,
+                    min(low, values.min()),
+                    max(high, values.max()),
+                ]
+        return pd.DataFrame(
+            {
+                name: {
+                    "count": n,
+                    "mean": mean,
+                    "std": np.sqrt(m2 / (n - 1)) if n > 1 else np.nan,
+                    "min": low,
+                    "max": high,
+                }
+                for name, (n, mean, m2, low, high) in stats.items()
+            }
+        )
+
+    def groupby(self, by: Union[str, List[str]]) -> "ChunkedGroupBy":
+        return ChunkedGroupBy(self, [by] if isinstance(by, str) else list(by))
+
+    def _reduce(self, partial: Callable[[pd.DataFrame], pd.Series], how: str) -> pd.Series:
+        result = None
+        for chunk in self.chunks():
+            part = partial(chunk)
+            if result is None:
+                result = part
+            else:
+                combined = pd.concat([result, part], axis=1)
+                result = getattr(combined, how)(axis=1)
+        return result if result is not None else pd.Series(dtype="float64")
+
+    # ----- profiling -----
+
+    def profile(self, unique_limit: int = 10_000) -> DatasetProfile:
+        """DatasetProfile computed in one streaming pass"""
+        first = self.head(5)
+        rows = 0
+        nulls: Dict[str, int] = {}
+        distinct: Dict[str, set] = {}
+        lows: Dict[str, Any] = {}
+        highs: Dict[str, Any] = {}
+        for chunk in self.chunks():
+            rows += len(chunk)
+            for name, count in chunk.isna().sum().items():
+                nulls[name] = nulls.get(name, 0) + int(count)
+            for name in chunk.columns:
+                series = chunk[name]
+                seen = distinct.setdefault(name, set())
+                if len(seen) <= unique_limit:
+                    seen.update(series.dropna().unique()[: unique_limit + 1 - len(seen)])
+                if pd.api.types.is_numeric_dtype(series) and series.notna().any():
+                    low, high = series.min(), series.max()
+                    lows[name] = low if name not in lows else min(lows[name], low)
+                    highs[name] = high if name not in highs else max(highs[name], high)
+
+        sample = build_profile(first)
+        columns = []
+        for column in sample.columns:
+            name = column.name
+            column.nulls = nulls.get(name, 0)
+            column.unique = min(len(distinct.get(name, ())), unique_limit)
+            column.unique_capped = len(distinct.get(name, ())) > unique_limit
+            if name in lows:
+                column.min = _clip(lows[name], 30)
+                column.max = _clip(highs[name], 30)
+            columns.append(column)
+        return DatasetProfile(rows=rows, columns=columns, sample=sample.sample)
+
+
+class ChunkedGroupBy:
+    """groupby() of a ChunkedTable; aggregations combine per-chunk partials"""
+
+    def __init__(self, table: ChunkedTable, by: List[str]):
+        self.table = table
+        self.by = by
+
+    def agg(self, spec: Dict[str, Union[str, List[str]]]) -> pd.DataFrame:
+        """spec maps column -> "sum" | "count" | "mean" | "min" | "max" (or a list)"""
+        spec = {col: [how] if isinstance(how, str) else list(how) for col, how in spec.items()}
+        parts = {}
+        for col, hows in spec.items():
+            for how in hows:
+                if how not in _AGG_PARTS:
+                    raise ValueError(f"Unsupported aggregation '{how}' (use {sorted(_AGG_PARTS)})")
+                for part in _AGG_PARTS[how]:
+                    parts.setdefault(col, set()).add(part)
+        part_spec = {col: sorted(needed) for col, needed in parts.items()}
+
+        running = None
+        for chunk in self.table.chunks():
+            if chunk.empty:
+                continue
+            partial = chunk.groupby(self.by, dropna=False).agg(part_spec)
+            if running is not None:
+                partial = pd.concat([running, partial])
+                partial = partial.groupby(level=list(range(len(self.by))), dropna=False).agg(
+                    {key: _COMBINE[key[1]] for key in partial.columns}
+                )
+            running = partial
+
+        result = pd.DataFrame(index=running.index if running is not None else None)
+        for col, hows in spec.items():
+            for how in hows:
+                name = col if len(hows) == 1 else f"{col}_{how}"
+                if running is None:
+                    result[name] = []
+                elif how == "mean":
+                    result[name] = running[(col, "sum")] / running[(col, "count")]
+                else:
+                    result[name] = running[(col, how)]
+        return result
+
+    def size(self) -> pd.Series:
+        counts = None
+        for chunk in self.table.chunks():
+            part = chunk.groupby(self.by, dropna=False).size()
+            counts = part if counts is None else counts.add(part, fill_value=0)
+        return counts.astype("int64") if counts is not None else pd.Series(dtype="int64")
+
+    def _single(self, column: str, how: str) -> pd.Series:
+        return self.agg({column: how})[column]
+
+    def sum(self, column: str) -> pd.Series:
+        return self._single(column, "sum")
+
+    def mean(self, column: str) -> pd.Series:
+        return self._single(column, "mean")
+
+    def count(self, column: str) -> pd.Series:
+        return self._single(column, "count")
+
+    def min(self, column: str) -> pd.Series:
+        return self._single(column, "min")
+
+    def max(self, column: str) -> pd.Series:
+        return self._single(column, "max")
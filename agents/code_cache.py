@@ -0,0 +1,111 @@
+"""
+Code Cache - Memoization for generated code
+
+Gemini often returns the same code for the same question. CompileCache
+keeps compiled code objects keyed by a hash of the source, and
+ResultCache keeps the output of deterministic code keyed by (code hash,
+the names it reads and the fingerprints of their files), so a repeat can
+skip exec entirely.
+"""
+
+import ast
+import hashlib
+import re
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from .caching import TTLCache
+
+
+# Calls and modules whose results change from run to run
+NONDETERMINISTIC_NAMES = {
+    "random", "secrets", "uuid", "time", "datetime", "os", "sys", "subprocess",
+    "open", "input", "eval", "exec", "__import__", "globals", "locals", "id", "hash",
+    "now", "today", "utcnow", "sample", "shuffle", "permutation", "choice",
+    "rand", "randn", "randint", "default_rng", "perf_counter", "monotonic",
+}
+
+_NONDETERMINISTIC_SQL = re.compile(
+    r"\b(random|uuid|gen_random_uuid|setseed|now|today|current_date|current_time"
+    r"|current_timestamp|get_current_time|read_csv\w*|read_parquet|read_json\w*"
+    r"|using\s+sample|tablesample)\b",
+    re.IGNORECASE,
+)
+
+
+def code_hash(code: str) -> str:
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def referenced_names(code: str) -> Optional[set]:
+    """Every identifier and attribute name used by code (None if it doesn't parse)"""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            names.add(node.id)
+        elif isinstance(node, ast.Attribute):
+            names.add(node.attr)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                names.update(alias.name.split("."))
+            if isinstance(node, ast.ImportFrom) and node.module:
+                names.update(node.module.split("."))
+    return names
+
+
+def is_deterministic(code: str) -> bool:
+    """Conservative check: False if the code might give a different output next time"""
+    names = referenced_names(code)
+    return names is not None and not (names & NONDETERMINISTIC_NAMES)
+
+
+def is_deterministic_sql(sql: str) -> bool:
+    """Conservative check for SQL: no random, clock or file-reading functions"""
+    return not _NONDETERMINISTIC_SQL.search(sql)
+
+
+class CompileCache:
+    """LRU cache of compiled code objects, keyed by source hash"""
+
+    def __init__(self, maxsize: int = 256):
+        self._cache = TTLCache(maxsize=maxsize, ttl=None)
+
+    def compile(self, code: str) -> Tuple[Any, bool]:
+        """Returns (code object, hit)"""
+        key = code_hash(code)
+        compiled = self._cache.get(key)
+        if compiled is not None:
+            return compiled, True
+        # "<string>" is what exec() of a plain string would use
+        compiled = compile(code, "<string>", "exec")
+        self._cache.set(key, compiled)
+        return compiled, False
+
+
+class ResultCache:
+    """
+    Outputs of deterministic code, keyed by the code hash and its inputs:
+    (variable name, file fingerprint) pairs.
+
+    Only valid when every execution starts from the files' contents, as in
+    the sandbox pool where each task gets fresh copies of its DataFrames.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: Optional[float] = 3600):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def key(code: str, inputs: Iterable[Tuple[str, tuple]]) -> tuple:
+        return code_hash(code), tuple(sorted(inputs))
+
+    def get(self, key: tuple) -> Optional[Dict[str, Any]]:
+        return self._cache.get(key)
+
+    def set(self, key: tuple, result: Dict[str, Any]):
+        self._cache.set(key, result)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._cache), "hits": self._cache.hits, "misses": self._cache.misses}
@@ -3,24 +3,135 @@ Code Interpreter Agent - Simple example agent for data analysis
 """
 
 import google.generativeai as genai
-from typing import Dict, Any, List
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional
+import asyncio
 import io
+import os
+import re
+import sys
+import threading
+import time
 import traceback
 import pandas as pd
 import numpy as np
 from contextlib import redirect_stdout, redirect_stderr
 
 from .base_agent import BaseAgent, AgentResult
+from .llm_client import LLMClient
+from .response_cache import ResponseCache, get_response_cache
+from .caching import TTLCache
+from .chunked import DEFAULT_CHUNK_ROWS, ChunkedTable
+from .code_cache import (
+    CompileCache,
+    ResultCache,
+    is_deterministic,
+    is_deterministic_sql,
+    referenced_names,
+)
+from .dataframe_cache import dataframe_cache, file_fingerprint
+from .dataset_profile import DatasetProfile, render_profile
+from .token_budget import TokenBudget
+from .sandbox import ExecutionLimits, SandboxPool
+from .sql_engine import SQLEngine
+
+
+# redirect_stdout is process-wide, so inline executions must take turns
+_inline_lock = threading.Lock()
+
+
+class ExecutionStopped(Exception):
+    """Raised inside inline executions that hit a limit or were cancelled"""
+
+    def __init__(self, status: str, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class LoadedFrame:
+    """A DataFrame loaded into a session's namespace"""
+
+    name: str  # Python variable name used in generated code
+    filename: str  # Original upload name, kept as an alias
+    path: str
+    df: Optional[pd.DataFrame]  # Only loaded for inline execution
+    profile: DatasetProfile
+    chunked: bool = False  # Exposed as a ChunkedTable instead of a DataFrame
+
+    def value(self, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Any:
+        """What generated code sees under this frame's name"""
+        return ChunkedTable(self.path, chunk_rows) if self.chunked else self.df
+
+
+def safe_variable_name(filename: str) -> str:
+    """Python/SQL identifier for an uploaded file (other characters become _)"""
+    name = re.sub(r"[^A-Za-z0-9_]", "_", filename.replace(".csv", ""))
+    return name if name and not name[0].isdigit() else f"_{name}"
 
 
 class CodeInterpreterAgent(BaseAgent):
     """Simple agent that analyzes CSV data using Python code"""
 
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        profile_char_budget: int = 6000,
+        prompt_token_budget: int = 8000,
+        execution_mode: str = "pool",
+        sandbox_workers: int = 2,
+        sandbox_cache_mb: int = 256,
+        timeout_seconds: Optional[float] = 30.0,
+        cpu_seconds: Optional[int] = 20,
+        memory_limit_mb: Optional[int] = 1024,
+        result_cache_size: int = 256,
+        response_cache: Optional[ResponseCache] = None,
+        data_mode: str = "memory",
+        chunk_rows: int = DEFAULT_CHUNK_ROWS,
+        chunked_threshold_mb: int = 512,
+        language: str = "python",
+        sql_threads: Optional[int] = None,
+    ):
         super().__init__(name="CodeInterpreter", api_key=api_key)
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel("gemini-2.5-flash")
-        self.dataframes: Dict[str, pd.DataFrame] = {}
+        # Identical prompts (same query, same dataset profiles) reuse the
+        # stored response; configured by LLM_CACHE_* unless one is passed in
+        self.response_cache = response_cache or get_response_cache()
+        self.llm = LLMClient("gemini-2.5-flash", cache=self.response_cache)
+        # session_id -> variable name -> loaded frame
+        self.dataframes: Dict[str, Dict[str, LoadedFrame]] = {}
+        # Characters of the prompt spent describing DataFrames (shared by all frames)
+        self.profile_char_budget = profile_char_budget
+        self.prompt_token_budget = prompt_token_budget
+        # "pool": run generated code in warm worker processes
+        # "inline": run it in a thread of this process (one at a time)
+        # The pool's workers are started by startup(), with the server.
+        self.execution_mode = execution_mode
+        self.sandbox = SandboxPool(
+            size=sandbox_workers, cache_bytes=sandbox_cache_mb * 1024 * 1024
+        )
+        # Per-execution limits. The memory limit only applies in pool mode;
+        # inline executions check the time limits between Python lines.
+        self.limits = ExecutionLimits(
+            timeout_seconds=timeout_seconds,
+            cpu_seconds=cpu_seconds,
+            memory_bytes=memory_limit_mb * 1024 * 1024 if memory_limit_mb else None,
+        )
+        self.compiled_code = CompileCache()
+        # Outputs of deterministic code (pool and SQL modes; 0 disables it)
+        self.result_cache = ResultCache(maxsize=result_cache_size) if result_cache_size else None
+        # "memory": files are loaded as DataFrames
+        # "chunked": files are exposed as ChunkedTables streamed from disk
+        # "auto": chunked for files over chunked_threshold_mb
+        self.data_mode = data_mode
+        self.chunk_rows = chunk_rows
+        self.chunked_threshold_bytes = chunked_threshold_mb * 1024 * 1024
+        # Streaming profiles of chunked files, keyed by file fingerprint
+        self.chunked_profiles = TTLCache(maxsize=256, ttl=None)
+        # "python": Gemini writes pandas code, run by exec
+        # "sql": Gemini writes SQL, run by DuckDB over the files themselves
+        self.language = language
+        self.sql = SQLEngine(threads=sql_threads)
 
     def get_capabilities(self) -> List[str]:
         return [
@@ -35,16 +146,31 @@ class CodeInterpreterAgent(BaseAgent):
         context = input_data.get("context", {})
         files = input_data.get("files", {})
 
+        session_id = input_data.get("session_id", "default")
+        frames = self.dataframes.setdefault(session_id, {})
+
         # Load CSV files if provided
         if files:
             for filename, filepath in files.items():
+                name = safe_variable_name(filename)
+                loaded = frames.get(name)
+                if loaded is not None and loaded.path == filepath:
+                    continue
                 try:
-                    df = pd.read_csv(filepath)
-                    safe_name = (
-                        filename.replace(".csv", "").replace("-", "_").replace(" ", "_")
-                    )
-                    self.dataframes[safe_name] = df
-                    self.dataframes[filename] = df
+                    if self._use_chunks(filepath):
+                        profile = await asyncio.to_thread(self._chunked_profile, filepath)
+                        frames[name] = LoadedFrame(
+                            name, filename, filepath, None, profile, chunked=True
+                        )
+                        continue
+                    # On a cache miss these parse the file: keep it off the event loop
+                    profile = await asyncio.to_thread(dataframe_cache.get_profile, filepath)
+                    df = None
+                    if self.execution_mode == "inline":
+                        # Copy: generated code may modify the frame in place.
+                        # Pool workers load their own copy.
+                        df = await asyncio.to_thread(self._frame_copy, filepath)
+                    frames[name] = LoadedFrame(name, filename, filepath, df, profile)
                 except Exception as e:
                     return AgentResult(
                         success=False,
@@ -54,11 +180,10 @@ class CodeInterpreterAgent(BaseAgent):
                     )
 
         # Build prompt for Gemini
-        prompt = self._build_prompt(query, context)
+        prompt = self._build_prompt(query, context, frames)
 
         try:
-            response = self.model.generate_content(prompt)
-            response_text = response.text
+            response_text = await self.llm.generate(prompt)
 
             # Extract and execute code blocks
             code_blocks = self._extract_code_blocks(response_text)
@@ -75,8 +200,9 @@ class CodeInterpreterAgent(BaseAgent):
             # Execute code
             execution_results = []
             for code in code_blocks:
-                result = self._execute_code(code)
+                result = await self._run_code(code, frames)
                 execution_results.append(result)
+                await self.emit(input_data, "code_output", result)
 
             return AgentResult(
                 success=True,
@@ -98,21 +224,81 @@ class CodeInterpreterAgent(BaseAgent):
                 agent_name=self.name,
             )
 
-    def _build_prompt(self, query: str, context: Dict[str, Any]) -> str:
-        prompt = f"""You are a Python data analysis expert. Analyze the user's query and provide Python code.
+    def startup(self):
+        if self.execution_mode == "pool" and self.language == "python":
+            self.sandbox.start()
+
+    def shutdown(self):
+        self.sandbox.stop()
+
+    def end_session(self, session_id: str):
+        """Drop the DataFrames loaded for a session"""
+        self.dataframes.pop(session_id, None)
+
+    def active_sessions(self) -> List[str]:
+        return list(self.dataframes)
+
+    def _use_chunks(self, path: str) -> bool:
+        if self.data_mode == "chunked" or self.language == "sql":
+            return True
+        if self.data_mode == "auto":
+            return os.path.getsize(path) > self.chunked_threshold_bytes
+        return False
+
+    def _frame_copy(self, path: str) -> pd.DataFrame:
+        return dataframe_cache.get(path).copy()
+
+    def _chunked_profile(self, path: str) -> DatasetProfile:
+        key = file_fingerprint(path)
+        profile = self.chunked_profiles.get(key)
+        if profile is None:
+            profile = ChunkedTable(path, self.chunk_rows).profile()
+            self.chunked_profiles.set(key, profile)
+        return profile
+
+    def _build_prompt(
+        self, query: str, context: Dict[str, Any], frames: Dict[str, LoadedFrame]
+    ) -> str:
+        if self.language == "sql":
+            return self._build_sql_prompt(query, frames)
+
+        budget = TokenBudget(self.prompt_token_budget)
+        budget.add(
+            "header",
+            f"""You are a Python data analysis expert. Analyze the user's query and provide Python code.
 
 User Query: {query}
 
-"""
-        if self.dataframes:
-            prompt += "Available DataFrames (ALREADY LOADED):\n"
-            for name, df in self.dataframes.items():
-                prompt += f"\nVariable: {name}\n"
-                prompt += f"  Shape: {df.shape}\n"
-                prompt += f"  Columns: {df.columns.tolist()}\n"
-                prompt += f"  Sample:\n{df.head().to_string()}\n"
-
-        prompt += """
+""",
+            required=True,
+        )
+        if frames:
+            frames_text = "Available DataFrames (ALREADY LOADED):\n"
+            char_budget = self.profile_char_budget // len(frames)
+            for name, loaded in frames.items():
+                frames_text += render_profile(name, loaded.profile, char_budget)
+            budget.add("dataframes", frames_text, priority=1)
+
+            chunked = [name for name, loaded in frames.items() if loaded.chunked]
+            if chunked:
+                budget.add(
+                    "chunked",
+                    f"""
+{", ".join(chunked)} {"is a ChunkedTable" if len(chunked) == 1 else "are ChunkedTables"}, not DataFrames: the data is too large for memory
+and is streamed from disk. Supported operations:
+- Lazy: t.query("expr"), t.filter(lambda df: mask), t[["col", ...]]
+- Aggregates (one pass): len(t), t.sum(), t.mean(), t.min(), t.max(), t.count(),
+  t.describe(), t.value_counts("col", top=10)
+- Grouped: t.groupby("col").agg({{"x": "sum", "y": ["mean", "max"]}}), t.groupby("col").size()
+- t.head(n) returns a DataFrame; t.collect() materializes a small filtered result
+Aggregate or filter before collecting; any other pandas operation needs a DataFrame from head() or collect().
+""",
+                    required=True,
+                )
+
+        budget.add(
+            "instructions",
+            """
 Instructions:
 1. DataFrames are ALREADY LOADED - DO NOT use pd.read_csv()
 2. Write Python code in ```python blocks
@@ -121,8 +307,43 @@ Instructions:
 5. Don't create visualizations
 
 Provide your analysis and code:
-"""
-        return prompt
+""",
+            required=True,
+        )
+        return budget.render()
+
+    def _build_sql_prompt(self, query: str, frames: Dict[str, LoadedFrame]) -> str:
+        budget = TokenBudget(self.prompt_token_budget)
+        budget.add(
+            "header",
+            f"""You are a SQL data analysis expert. Analyze the user's query and answer it with DuckDB SQL.
+
+User Query: {query}
+
+""",
+            required=True,
+        )
+        if frames:
+            tables_text = "Available tables:\n"
+            char_budget = self.profile_char_budget // len(frames)
+            for name, loaded in frames.items():
+                tables_text += render_profile(name, loaded.profile, char_budget, label="Table")
+            budget.add("dataframes", tables_text, priority=1)
+
+        budget.add(
+            "instructions",
+            """
+Instructions:
+1. The tables are ALREADY AVAILABLE - query them by name, don't read files
+2. Write DuckDB SQL in ```sql blocks, one SELECT per block
+3. Each query's result table is shown to the user, so aggregate and keep results small
+4. Don't create, modify or drop tables
+
+Provide your analysis and SQL:
+""",
+            required=True,
+        )
+        return budget.render()
 
     def _extract_code_blocks(self, text: str) -> List[str]:
         code_blocks = []
@@ -131,7 +352,7 @@ Provide your analysis and code:
         current_block = []
 
         for line in lines:
-            if line.strip().startswith("```python"):
+            if line.strip().startswith(f"```{self.language}"):
                 in_code_block = True
                 current_block = []
             elif line.strip() == "```" and in_code_block:
@@ -143,19 +364,106 @@ Provide your analysis and code:
 
         return code_blocks
 
-    def _execute_code(self, code: str) -> Dict[str, Any]:
-        # Create safe environment with dataframes
-        safe_dataframes = {}
-        for name, df in self.dataframes.items():
-            safe_name = name.replace(".csv", "").replace("-", "_").replace(" ", "_")
-            safe_dataframes[safe_name] = df
-            safe_dataframes[name] = df
-
-        exec_globals = {
-            "pd": pd,
-            "np": np,
-            **safe_dataframes,
-        }
+    async def _run_code(self, code: str, frames: Dict[str, LoadedFrame]) -> Dict[str, Any]:
+        """Run generated code off the event loop"""
+        if self.language == "sql":
+            return await self._run_sql(code, frames)
+
+        if self.execution_mode == "pool":
+            paths = {}
+            for name, loaded in frames.items():
+                paths[name] = loaded.path
+                paths[loaded.filename] = loaded.path
+
+            key = self._result_cache_key(code, frames)
+            if key is not None:
+                cached = self.result_cache.get(key)
+                if cached is not None:
+                    return {**cached, "cache": {**cached["cache"], "result": "hit"}}
+
+            chunked_paths = [loaded.path for loaded in frames.values() if loaded.chunked]
+            result = await self.sandbox.run(
+                code, paths, self.limits, chunked_paths, self.chunk_rows
+            )
+            result.setdefault("cache", {})["result"] = "miss" if key is not None else "skipped"
+            if key is not None and result["status"] == "ok":
+                self.result_cache.set(key, result)
+            return result
+
+        cancelled = threading.Event()
+        try:
+            return await asyncio.to_thread(self._execute_code, code, frames, cancelled)
+        except asyncio.CancelledError:
+            # The thread stops at its next line of generated code
+            cancelled.set()
+            raise
+
+    async def _run_sql(self, sql: str, frames: Dict[str, LoadedFrame]) -> Dict[str, Any]:
+        """Run a generated SQL query in a thread; DuckDB parallelizes it internally"""
+        key = self._result_cache_key(sql, frames)
+        if key is not None:
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                return {**cached, "cache": {"result": "hit"}}
+
+        tables = {name: loaded.path for name, loaded in frames.items()}
+        cancelled = threading.Event()
+        try:
+            result = await asyncio.to_thread(
+                self.sql.execute,
+                sql,
+                tables,
+                self.limits.timeout_seconds,
+                self.limits.memory_bytes,
+                cancelled,
+            )
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+        result["cache"] = {"result": "miss" if key is not None else "skipped"}
+        if key is not None and result["status"] == "ok":
+            self.result_cache.set(key, result)
+        return result
+
+    def _result_cache_key(self, code: str, frames: Dict[str, LoadedFrame]) -> Optional[tuple]:
+        """Result cache key for deterministic code, None when it can't be cached"""
+        if self.result_cache is None:
+            return None
+        if self.language == "sql":
+            if not is_deterministic_sql(code):
+                return None
+            # Cheap and safe: any of the session's tables may be referenced
+            names = set(frames)
+        else:
+            if not is_deterministic(code):
+                return None
+            names = referenced_names(code)
+        # Pairs, not just fingerprints: the same code with its names bound
+        # to different files is a different computation
+        inputs = set()
+        try:
+            for name, loaded in frames.items():
+                if name in names:
+                    inputs.add((name, file_fingerprint(loaded.path)))
+                if loaded.filename in names:
+                    inputs.add((loaded.filename, file_fingerprint(loaded.path)))
+        except OSError:
+            return None
+        return ResultCache.key(code, inputs)
+
+    def _execute_code(
+        self,
+        code: str,
+        frames: Dict[str, LoadedFrame],
+        cancelled: Optional[threading.Event] = None,
+    ) -> Dict[str, Any]:
+        # Create safe environment with this session's dataframes
+        exec_globals = {"pd": pd, "np": np}
+        for name, loaded in frames.items():
+            value = loaded.value(self.chunk_rows)
+            exec_globals[name] = value
+            exec_globals[loaded.filename] = value
 
         stdout_capture = io.StringIO()
         stderr_capture = io.StringIO()
@@ -165,17 +473,56 @@ Provide your analysis and code:
             "success": False,
             "output": "",
             "error": None,
+            "status": "error",
+            "cache": {"compile": "miss", "result": "skipped"},
         }
 
         try:
-            with redirect_stdout(stdout_capture), redirect_stderr(stderr_capture):
-                exec(code, exec_globals)
+            compiled, hit = self.compiled_code.compile(code)
+            result["cache"]["compile"] = "hit" if hit else "miss"
+            with _inline_lock, redirect_stdout(stdout_capture), redirect_stderr(stderr_capture):
+                sys.settrace(self._make_tracer(cancelled))
+                try:
+                    exec(compiled, exec_globals)
+                finally:
+                    sys.settrace(None)
 
             result["success"] = True
+            result["status"] = "ok"
             result["output"] = stdout_capture.getvalue()
 
+        except ExecutionStopped as e:
+            result["status"] = e.status
+            result["error"] = str(e)
+            result["output"] = stdout_capture.getvalue()
+        except MemoryError:
+            result["status"] = "oom"
+            result["error"] = "Execution ran out of memory"
         except Exception as e:
             result["error"] = str(e)
             result["output"] = stderr_capture.getvalue()
 
         return result
+
+    def _make_tracer(self, cancelled: Optional[threading.Event]):
+        """Trace function that stops generated code at the time limits or on cancel"""
+        limits = self.limits
+        started = time.monotonic()
+        cpu_started = time.thread_time()
+
+        def tracer(frame, event, arg):
+            if frame.f_code.co_filename != "<string>":
+                # Don't trace library code (pandas, numpy): too slow
+                return None
+            if event == "line":
+                if cancelled is not None and cancelled.is_set():
+                    raise ExecutionStopped("cancelled", "Execution was cancelled")
+                if limits.timeout_seconds and time.monotonic() - started > limits.timeout_seconds:
+                    raise ExecutionStopped(
+                        "timeout", f"Execution timed out after {limits.timeout_seconds:g}s"
+                    )
+                if limits.cpu_seconds and time.thread_time() - cpu_started > limits.cpu_seconds:
+                    raise ExecutionStopped("timeout", "Execution exceeded its CPU time limit")
+            return tracer
+
+        return tracer
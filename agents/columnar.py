@@ -0,0 +1,104 @@
+"""
+Columnar Sidecars - Arrow IPC copies of uploaded CSV files
+
+After a CSV is uploaded, write_sidecar() converts it batch by batch into
+an uncompressed Arrow IPC (Feather v2) file next to the CSV, so files
+larger than memory can be converted too. Column types are the ones
+pd.read_csv infers for the first rows. load_frame() prefers a fresh
+sidecar, memory-mapped, over re-tokenizing the CSV text.
+
+pyarrow is optional: without it everything falls back to pd.read_csv.
+"""
+
+import os
+import uuid
+from pathlib import Path
+from typing import Optional
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+
+
+SIDECAR_SUFFIX = ".arrow"
+
+# Rows pandas reads to decide the column types of the whole sidecar
+TYPE_SAMPLE_ROWS = 10_000
+
+
+def sidecar_path(csv_path: str) -> Path:
+    return Path(csv_path).with_suffix(SIDECAR_SUFFIX)
+
+
+def has_fresh_sidecar(csv_path: str) -> bool:
+    """True if a sidecar exists and is at least as new as the CSV"""
+    sidecar = sidecar_path(csv_path)
+    try:
+        return sidecar.stat().st_mtime_ns >= os.stat(csv_path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def write_sidecar(csv_path: str) -> Optional[Path]:
+    """Convert a CSV to an Arrow IPC sidecar; returns its path (None without pyarrow)"""
+    if feather is None:
+        return None
+
+    sidecar = sidecar_path(csv_path)
+    if has_fresh_sidecar(csv_path):
+        return sidecar
+
+    # Fixed types, so a date-like column stays text as it would in pandas.
+    # A later row that doesn't fit them (e.g. "1.5" in an int column)
+    # raises pyarrow.ArrowInvalid and no sidecar is written.
+    sample = pd.read_csv(csv_path, nrows=TYPE_SAMPLE_ROWS)
+    # Column names come from pandas too, so duplicate headers get the same
+    # "a.1" suffixes as in a frame loaded with pd.read_csv
+    column_names = [str(name) for name in sample.columns]
+    column_types = {
+        name: _arrow_type(dtype) for name, dtype in zip(column_names, sample.dtypes)
+    }
+    reader = pa_csv.open_csv(
+        csv_path,
+        read_options=pa_csv.ReadOptions(column_names=column_names, skip_rows=1),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=column_types, strings_can_be_null=True
+        ),
+    )
+
+    temp_path = sidecar.with_name(f".{sidecar.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        # Uncompressed so it can be memory-mapped on load
+        with pa.ipc.new_file(str(temp_path), reader.schema) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+        os.replace(temp_path, sidecar)
+    finally:
+        temp_path.unlink(missing_ok=True)
+    return sidecar
+
+
+def _arrow_type(dtype) -> "pa.DataType":
+    if pd.api.types.is_bool_dtype(dtype):
+        return pa.bool_()
+    if pd.api.types.is_integer_dtype(dtype):
+        return pa.int64()
+    if pd.api.types.is_float_dtype(dtype):
+        return pa.float64()
+    return pa.string()
+
+
+def load_frame(csv_path: str) -> pd.DataFrame:
+    """Load a CSV, from its sidecar when one is available"""
+    if feather is not None and has_fresh_sidecar(csv_path):
+        table = feather.read_table(str(sidecar_path(csv_path)), memory_map=True)
+        return table.to_pandas()
+    return pd.read_csv(csv_path)
+
+
+def remove_sidecar(csv_path: str):
+    sidecar_path(csv_path).unlink(missing_ok=True)
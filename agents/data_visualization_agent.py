@@ -1,9 +1,15 @@
 from .base_agent import BaseAgent, AgentResult
-from typing import Dict, Any, List
+from .chunked import DEFAULT_CHUNK_ROWS, ChunkedTable
+from .dataframe_cache import dataframe_cache, file_fingerprint
+from .downsample import DownsampleConfig, sample_chunks, sum_chunks
+from .plot_renderer import PLOT_TYPES, PlotRenderer, PlotSpec
+from .plot_store import PlotStore, render_key
+from typing import Dict, Any, List, Optional
+import asyncio
+import hashlib
+import json
+import os
 import pandas as pd
-import matplotlib.pyplot as plt
-import io
-import base64
 
 
 class DataVisualizationAgent(BaseAgent):
@@ -11,14 +17,42 @@ class DataVisualizationAgent(BaseAgent):
     Agent responsible for generating visualizations from tabular data.
     """
 
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        render_workers: int = 2,
+        plot_dir: str = "visualizations",
+        plot_url_prefix: str = "/plots",
+        plot_cache_mb: int = 256,
+        downsample: Optional[DownsampleConfig] = DownsampleConfig(),
+        chunked_threshold_mb: int = 512,
+        chunk_rows: int = DEFAULT_CHUNK_ROWS,
+        stream_max_points: int = 200_000,
+    ):
         super().__init__(name="DataVisualizer", api_key=api_key)
+        # At most render_workers charts are drawn at the same time
+        self.renderer = PlotRenderer(max_workers=render_workers)
+        # Charts are saved as files and returned as URLs, not inline images.
+        # The store also remembers which data + spec produced each file, so
+        # a repeated chart is served without loading data or rendering.
+        self.plots = PlotStore(plot_dir, plot_url_prefix, max_bytes=plot_cache_mb * 1024 * 1024)
+        # Thresholds for reducing large series before rendering (None: plot everything)
+        self.downsample = downsample
+        # Files over chunked_threshold_mb are never loaded whole: the two
+        # plotted columns are streamed in chunks of chunk_rows and reduced
+        # to at most stream_max_points rows (or to per-category totals)
+        self.chunked_threshold_bytes = chunked_threshold_mb * 1024 * 1024
+        self.chunk_rows = chunk_rows
+        self.stream_max_points = stream_max_points
+
+    def shutdown(self):
+        self.renderer.shutdown()
 
     def get_capabilities(self) -> List[str]:
         return [
             "Create visualizations (line, bar, scatter plots)",
             "Visualize CSV or previously analyzed data",
-            "Return plots as base64-encoded images",
+            "Return plots as image URLs",
         ]
 
     async def process(self, input_data: Dict[str, Any]) -> AgentResult:
@@ -32,14 +66,49 @@ class DataVisualizationAgent(BaseAgent):
         files = input_data.get("files", {})
         context = input_data.get("context", {})
         plot_type = input_data.get("plot_type", "line")
+        # Columns to plot; the first two columns when not given
+        x_request = input_data.get("x")
+        y_request = input_data.get("y")
+
+        if plot_type not in PLOT_TYPES:
+            return AgentResult(
+                success=False,
+                data={},
+                message=f"Unsupported plot type: {plot_type}",
+                agent_name=self.name,
+                next_agent="AnswerSynthesizer",
+            )
+
+        cache_key = None
+        source = self._data_fingerprint(files, context)
+        if source is not None:
+            cache_key = render_key(source, x_request, y_request, *self._spec_fields(plot_type))
+            cached = await asyncio.to_thread(self.plots.lookup, cache_key)
+            if cached is not None:
+                plot_info = {**cached, "cached": True}
+                await self.emit(input_data, "plot", plot_info)
+                return AgentResult(
+                    success=True,
+                    data=plot_info,
+                    message="Visualization created successfully",
+                    agent_name=self.name,
+                    next_agent="AnswerSynthesiser",
+                )
 
         df = None
+        columns = None
 
         # Try to load CSV if provided
         if files:
             try:
                 csv_path = list(files.values())[0]
-                df = pd.read_csv(csv_path)
+                if os.path.getsize(csv_path) > self.chunked_threshold_bytes:
+                    columns = await asyncio.to_thread(
+                        self._stream_columns, csv_path, x_request, y_request, plot_type
+                    )
+                else:
+                    # Parsing a CSV on a cache miss is blocking work
+                    df = await asyncio.to_thread(dataframe_cache.get, csv_path)
             except Exception as e:
                 return AgentResult(
                     success=False,
@@ -54,7 +123,16 @@ class DataVisualizationAgent(BaseAgent):
             if isinstance(data, dict) and "dataframe" in data:
                 df = pd.DataFrame(data["dataframe"])
 
-        if df is None or df.shape[1] < 2:
+        if df is not None and df.shape[1] >= 2:
+            x_col = x_request if x_request is not None else df.columns[0]
+            y_col = y_request if y_request is not None else df.columns[1]
+            if x_col in df.columns and y_col in df.columns:
+                # Plain arrays: the render thread never touches the shared DataFrame
+                columns = (x_col, y_col, df[x_col].to_numpy(), df[y_col].to_numpy(), None)
+            else:
+                columns = (x_col, y_col, None, None, None)
+
+        if columns is None:
             return AgentResult(
                 success=False,
                 data={},
@@ -62,42 +140,29 @@ class DataVisualizationAgent(BaseAgent):
                 agent_name=self.name,
             )
 
-        x_col = df.columns[0]
-        y_col = df.columns[1]
+        x_col, y_col, x_values, y_values, streamed = columns
+        if x_values is None:
+            return AgentResult(
+                success=False,
+                data={},
+                message=f"Columns not found: {x_col}, {y_col}",
+                agent_name=self.name,
+            )
 
         # Generate plot
         try:
-            plt.figure(figsize=(8, 5))
-
-            if plot_type == "line":
-                plt.plot(df[x_col], df[y_col])
-            elif plot_type == "bar":
-                plt.bar(df[x_col], df[y_col])
-            elif plot_type == "scatter":
-                plt.scatter(df[x_col], df[y_col])
-            else:
-                return AgentResult(
-                    success=False,
-                    data={},
-                    message=f"Unsupported plot type: {plot_type}",
-                    agent_name=self.name,
-                    next_agent="AnswerSynthesizer",
-                )
-
-            plt.xlabel(x_col)
-            plt.ylabel(y_col)
-            plt.title(f"{plot_type.capitalize()} plot of {y_col} vs {x_col}")
+            spec = PlotSpec(x=str(x_col), y=str(y_col), plot_type=plot_type)
+            plot = await self.renderer.render(x_values, y_values, spec, self.downsample)
+            if streamed is not None:
+                plot.reduction = {**(plot.reduction or {}), "streamed": streamed}
 
-            buffer = io.BytesIO()
-            plt.savefig(buffer, format="png")
-            plt.close()
-            buffer.seek(0)
-
-            image_base64 = base64.b64encode(buffer.read()).decode("utf-8")
+            plot_info = await asyncio.to_thread(self.plots.save, plot, cache_key)
+            plot_info["cached"] = False
+            await self.emit(input_data, "plot", plot_info)
 
             return AgentResult(
                 success=True,
-                data={"plot_base64": image_base64},
+                data=plot_info,
                 message="Visualization created successfully",
                 agent_name=self.name,
                 next_agent="AnswerSynthesiser",  # chain to explanation
@@ -110,3 +175,62 @@ class DataVisualizationAgent(BaseAgent):
                 message=f"Visualization error: {str(e)}",
                 agent_name=self.name,
             )
+
+    def _stream_columns(
+        self, path: str, x_request: Optional[str], y_request: Optional[str], plot_type: str
+    ) -> Optional[tuple]:
+        """Plot columns of a large file, reduced chunk by chunk (None if it has < 2 columns)"""
+        table = ChunkedTable(path, self.chunk_rows)
+        names = table.columns
+        if len(names) < 2:
+            return None
+        x_col = x_request if x_request is not None else names[0]
+        y_col = y_request if y_request is not None else names[1]
+        if x_col not in names or y_col not in names:
+            return x_col, y_col, None, None, None
+
+        pairs = (
+            (chunk[x_col].to_numpy(), chunk[y_col].to_numpy())
+            for chunk in table.select(list(dict.fromkeys([x_col, y_col]))).chunks()
+        )
+        # Bars show a total per category; lines and scatters an even sample
+        y_numeric = pd.api.types.is_numeric_dtype(table.select(y_col).head(0)[y_col])
+        if plot_type == "bar" and y_numeric:
+            x_values, y_values, rows = sum_chunks(pairs)
+            method = "sum_by_category"
+        else:
+            x_values, y_values, rows = sample_chunks(pairs, self.stream_max_points)
+            method = "stride"
+        streamed = {"method": method, "input_rows": rows, "output_rows": len(x_values)}
+        return x_col, y_col, x_values, y_values, streamed
+
+    def _spec_fields(self, plot_type: str) -> tuple:
+        """Everything besides data and columns that changes the rendered image"""
+        spec = PlotSpec(x="", y="", plot_type=plot_type)
+        return (
+            spec.plot_type,
+            spec.figsize,
+            spec.dpi,
+            spec.format,
+            self.downsample,
+            self.chunked_threshold_bytes,
+            self.stream_max_points,
+        )
+
+    def _data_fingerprint(
+        self, files: Dict[str, str], context: Dict[str, Any]
+    ) -> Optional[tuple]:
+        """Identifies the data a chart would be drawn from, without loading it"""
+        if files:
+            try:
+                return file_fingerprint(list(files.values())[0])
+            except OSError:
+                return None
+        data = context.get("codeinterpreter_data")
+        if isinstance(data, dict) and "dataframe" in data:
+            try:
+                encoded = json.dumps(data["dataframe"], sort_keys=True, default=str)
+            except (TypeError, ValueError):
+                return None
+            return ("inline", hashlib.sha256(encoded.encode("utf-8")).hexdigest())
+        return None
@@ -0,0 +1,116 @@
+"""
+DataFrame Cache - Parsed CSV files shared by all agents
+
+Files are keyed by their fingerprint (path, size, mtime), so a CSV is
+parsed once no matter how many agents or turns use it, and a changed
+file is parsed again. Entries are evicted least-recently-used first once
+their combined memory footprint goes over max_bytes.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+import pandas as pd
+
+from .columnar import load_frame
+from .dataset_profile import DatasetProfile, build_profile
+
+
+Fingerprint = Tuple[str, int, int]
+
+
+def file_fingerprint(path: str) -> Fingerprint:
+    """(absolute path, size, mtime in ns) of a file"""
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+
+@dataclass
+class CacheEntry:
+    df: pd.DataFrame
+    size: int
+    profile: Optional[DatasetProfile] = None
+
+
+class DataFrameCache:
+    """
+    Size-bounded cache of parsed DataFrames.
+
+    get() returns the cached frame itself; treat it as read-only and
+    copy() it before handing it to code that might modify it.
+    """
+
+    def __init__(self, max_bytes: int = 512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._frames: "OrderedDict[Fingerprint, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, path: str) -> pd.DataFrame:
+        return self._entry(path).df
+
+    def get_profile(self, path: str) -> DatasetProfile:
+        """Profile of a file's DataFrame, computed once and cached with it"""
+        entry = self._entry(path)
+        if entry.profile is None:
+            entry.profile = build_profile(entry.df)
+        return entry.profile
+
+    def _entry(self, path: str) -> CacheEntry:
+        key = file_fingerprint(path)
+        with self._lock:
+            entry = self._frames.get(key)
+            if entry is not None:
+                self._frames.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        df = self._load(path)
+        entry = CacheEntry(df, int(df.memory_usage(deep=True).sum()))
+
+        with self._lock:
+            if key in self._frames:
+                return self._frames[key]
+            self._frames[key] = entry
+            self.total_bytes += entry.size
+            self._evict(keep=key)
+        return entry
+
+    def invalidate(self, path: str):
+        """Forget every cached version of a file"""
+        path = os.path.abspath(path)
+        with self._lock:
+            for key in [key for key in self._frames if key[0] == path]:
+                self.total_bytes -= self._frames.pop(key).size
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "frames": len(self._frames),
+            "total_bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _load(self, path: str) -> pd.DataFrame:
+        return load_frame(path)
+
+    def _evict(self, keep: Fingerprint):
+        while self.total_bytes > self.max_bytes and len(self._frames) > 1:
+            key = next(iter(self._frames))
+            if key == keep:
+                self._frames.move_to_end(key)
+                continue
+            self.total_bytes -= self._frames.pop(key).size
+            self.evictions += 1
+
+
+# Shared by every agent in the process
+dataframe_cache = DataFrameCache()
@@ -0,0 +1,107 @@
+"""
+Dataset Profile - Compact description of a DataFrame for prompts
+
+The profile is computed once when a file is loaded and cached with the
+frame, so building a prompt never has to touch the data again.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+import pandas as pd
+
+
+@dataclass
+class ColumnProfile:
+    """Summary of one column"""
+
+    name: str
+    dtype: str
+    nulls: int
+    unique: int
+    min: Optional[Any] = None
+    max: Optional[Any] = None
+    unique_capped: bool = False  # unique is a lower bound (streaming profiles)
+
+
+@dataclass
+class DatasetProfile:
+    """Summary of a DataFrame: shape, per-column stats and a small sample"""
+
+    rows: int
+    columns: List[ColumnProfile] = field(default_factory=list)
+    sample: str = ""
+
+
+def _clip(value: Any, width: int) -> str:
+    text = f"{value:.6g}" if isinstance(value, float) else str(value)
+    return text if len(text) <= width else text[: width - 3] + "..."
+
+
+def build_profile(
+    df: pd.DataFrame,
+    sample_rows: int = 5,
+    sample_columns: int = 20,
+    max_cell_width: int = 30,
+) -> DatasetProfile:
+    """Compute a profile; the sample is capped in rows, columns and cell width"""
+    nulls = df.isna().sum()
+    columns = []
+    for name in df.columns:
+        series = df[name]
+        column = ColumnProfile(
+            name=str(name),
+            dtype=str(series.dtype),
+            nulls=int(nulls[name]),
+            unique=int(series.nunique(dropna=True)),
+        )
+        if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series):
+            if column.nulls < len(series):
+                column.min = _clip(series.min(), max_cell_width)
+                column.max = _clip(series.max(), max_cell_width)
+        columns.append(column)
+
+    head = df.iloc[:sample_rows, :sample_columns]
+    head = head.apply(lambda col: col.map(lambda value: _clip(value, max_cell_width)))
+    head.columns = [_clip(name, max_cell_width) for name in head.columns]
+    sample = head.to_string()
+    if df.shape[1] > sample_columns:
+        sample += f"\n[{df.shape[1] - sample_columns} more columns not shown]"
+
+    return DatasetProfile(rows=len(df), columns=columns, sample=sample)
+
+
+def render_profile(
+    name: str, profile: DatasetProfile, char_budget: int = 4000, label: str = "Variable"
+) -> str:
+    """Render a profile for a prompt, staying within char_budget characters"""
+    lines = [
+        f"\n{label}: {name}",
+        f"  Shape: ({profile.rows}, {len(profile.columns)})",
+        "  Columns:",
+    ]
+    used = sum(len(line) + 1 for line in lines)
+
+    for index, column in enumerate(profile.columns):
+        line = (
+            f"    - {column.name} ({column.dtype}), "
+            f"nulls={column.nulls}, unique{'>=' if column.unique_capped else '='}{column.unique}"
+        )
+        if column.min is not None:
+            line += f", range=[{column.min}, {column.max}]"
+        if used + len(line) + 1 > char_budget:
+            lines.append(f"    ... {len(profile.columns) - index} more columns")
+            used += len(lines[-1]) + 1
+            break
+        lines.append(line)
+        used += len(line) + 1
+
+    remaining = char_budget - used - len("  Sample:\n") - 1
+    if remaining > 0 and profile.sample:
+        sample = profile.sample
+        if len(sample) > remaining:
+            # Keep whole lines of the sample
+            sample = sample[:remaining].rsplit("\n", 1)[0]
+        if sample:
+            lines.append(f"  Sample:\n{sample}")
+
+    return "\n".join(lines) + "\n"
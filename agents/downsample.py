@@ -0,0 +1,210 @@
+"""
+Downsampling - Shrinks large series before they are plotted
+
+A chart is at most a few thousand pixels wide, so drawing millions of
+points only costs time and turns the image into a solid blob. Before
+rendering, series over the configured thresholds are reduced:
+
+- line:    min/max per bucket (keeps every spike) or LTTB
+           (Largest-Triangle-Three-Buckets, keeps the visual shape)
+- scatter: 2D histogram, drawn as a density heatmap
+- bar:     top-N categories by total, the rest summed into "Other"
+
+Everything except LTTB's bucket walk is vectorized with numpy/pandas.
+
+Files too large to load are streamed instead: sample_chunks() keeps an
+evenly spaced sample of bounded size and sum_chunks() totals bar values
+per category, one chunk at a time.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class DownsampleConfig:
+    line_max_points: int = 2000
+    line_method: str = "minmax"  # or "lttb"
+    scatter_max_points: int = 5000
+    scatter_bins: int = 200
+    bar_max_categories: int = 30
+
+
+@dataclass
+class PlotData:
+    """What actually gets drawn: points, or a density grid for scatter plots"""
+
+    x: Any
+    y: Any
+    # (counts, x_edges, y_edges) when a scatter plot was binned
+    density: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+
+
+def _as_numbers(values: np.ndarray) -> Optional[np.ndarray]:
+    """float64 view of numeric or datetime values, None for anything else"""
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype("datetime64[ns]").astype("int64").astype("float64")
+    if np.issubdtype(values.dtype, np.number) or values.dtype == bool:
+        return values.astype("float64")
+    return None
+
+
+def stride_indices(n: int, n_out: int) -> np.ndarray:
+    return np.unique(np.linspace(0, n - 1, n_out).round().astype("int64"))
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices of the min and max point of equal-size buckets, about n_out in total"""
+    n = len(y)
+    if n <= n_out:
+        return np.arange(n)
+    # Two points per bucket, plus the first and last point
+    buckets = max((n_out - 2) // 2, 1)
+    bucket = np.arange(n) * buckets // n
+    # Sorted by bucket, then by value: each bucket's first entry is its
+    # min and its last entry its max
+    order = np.lexsort((y, bucket))
+    starts = np.flatnonzero(np.r_[True, bucket[order][1:] != bucket[order][:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    return np.unique(np.concatenate([order[starts], order[ends], [0, n - 1]]))
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets selection of n_out points"""
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype("int64")
+    # Average point of each bucket, used as the third triangle corner
+    sums_x = np.add.reduceat(x[1 : n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1 : n - 1], edges[:-1] - 1)
+    sizes = np.diff(edges)
+    avg_x = np.append(sums_x / sizes, x[-1])
+    avg_y = np.append(sums_y / sizes, y[-1])
+
+    selected = np.empty(n_out, dtype="int64")
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        px, py = x[previous], y[previous]
+        area = np.abs(
+            (px - avg_x[bucket + 1]) * (y[start:end] - py)
+            - (px - x[start:end]) * (avg_y[bucket + 1] - py)
+        )
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def reduce_for_plot(
+    x_values: np.ndarray,
+    y_values: np.ndarray,
+    plot_type: str,
+    config: DownsampleConfig,
+) -> Tuple[PlotData, Optional[Dict[str, Any]]]:
+    """Reduce the series for plot_type; returns the data and what was done (None if nothing)"""
+    n = len(x_values)
+    x_numbers = _as_numbers(x_values)
+    y_numbers = _as_numbers(y_values)
+
+    if plot_type == "line" and n > config.line_max_points:
+        finite = None
+        if y_numbers is not None:
+            positions = x_numbers if x_numbers is not None else np.arange(n, dtype="float64")
+            # Missing values can't be ranked; reduce the finite points only
+            finite = np.flatnonzero(np.isfinite(positions) & np.isfinite(y_numbers))
+        if finite is None or len(finite) == 0:
+            method, keep = "stride", stride_indices(n, config.line_max_points)
+        else:
+            if config.line_method == "lttb":
+                method = "lttb"
+                picked = lttb_indices(
+                    positions[finite], y_numbers[finite], config.line_max_points
+                )
+            else:
+                method = "minmax"
+                picked = minmax_indices(y_numbers[finite], config.line_max_points)
+            keep = finite[picked]
+        data = PlotData(x_values[keep], y_values[keep])
+        return data, _report(method, n, len(keep), config.line_max_points)
+
+    if plot_type == "scatter" and n > config.scatter_max_points:
+        finite = None
+        if x_numbers is not None and y_numbers is not None:
+            finite = np.isfinite(x_numbers) & np.isfinite(y_numbers)
+        if finite is None or not finite.any():
+            keep = stride_indices(n, config.scatter_max_points)
+            data = PlotData(x_values[keep], y_values[keep])
+            return data, _report("stride", n, len(keep), config.scatter_max_points)
+        counts, x_edges, y_edges = np.histogram2d(
+            x_numbers[finite], y_numbers[finite], bins=config.scatter_bins
+        )
+        data = PlotData(None, None, density=(counts, x_edges, y_edges))
+        report = _report("hist2d", n, int((counts > 0).sum()), config.scatter_max_points)
+        report["bins"] = config.scatter_bins
+        return data, report
+
+    if plot_type == "bar" and n > config.bar_max_categories and y_numbers is not None:
+        totals = pd.Series(y_numbers).groupby(pd.Series(x_values).astype(str), sort=False).sum()
+        if len(totals) > config.bar_max_categories:
+            top = totals.nlargest(config.bar_max_categories - 1)
+            other = totals.drop(top.index).sum()
+            top = pd.concat([top, pd.Series({"Other": other})])
+            data = PlotData(top.index.to_numpy(), top.to_numpy())
+            report = _report("top_n", n, len(top), config.bar_max_categories)
+            report["input_categories"] = len(totals)
+            return data, report
+
+    return PlotData(x_values, y_values), None
+
+
+def sample_chunks(
+    chunks: Iterable[Tuple[np.ndarray, np.ndarray]], max_points: int
+) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Every step-th row of a stream of (x, y) chunks, at most max_points rows, in order
+
+    The step doubles (dropping every other kept row) whenever the sample
+    would grow past max_points. Returns the sample and the rows seen.
+    """
+    step, seen, kept = 1, 0, 0
+    xs, ys = [], []
+    for x, y in chunks:
+        keep = np.arange((-seen) % step, len(x), step)
+        seen += len(x)
+        xs.append(x[keep])
+        ys.append(y[keep])
+        kept += len(keep)
+        while kept > max_points:
+            # Kept rows sit at multiples of step; keep the multiples of 2 * step
+            x_all, y_all = np.concatenate(xs)[::2], np.concatenate(ys)[::2]
+            xs, ys, kept = [x_all], [y_all], len(x_all)
+            step *= 2
+    if not xs:
+        return np.array([]), np.array([]), 0
+    return np.concatenate(xs), np.concatenate(ys), seen
+
+
+def sum_chunks(chunks: Iterable[Tuple[np.ndarray, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Total of y per x category over a stream of (x, y) chunks, plus the rows seen"""
+    partials = []
+    seen = 0
+    for x, y in chunks:
+        seen += len(x)
+        partials.append(pd.Series(y).groupby(pd.Series(x), sort=False).sum())
+    if not partials:
+        return np.array([]), np.array([]), 0
+    totals = pd.concat(partials).groupby(level=0, sort=False).sum()
+    return totals.index.to_numpy(), totals.to_numpy(), seen
+
+
+def _report(method: str, n_in: int, n_out: int, threshold: int) -> Dict[str, Any]:
+    return {
+        "method": method,
+        "input_points": n_in,
+        "output_points": n_out,
+        "threshold": threshold,
+    }
@@ -0,0 +1,120 @@
+"""
+Fast Router - Local intent classification in front of the LLM router
+
+Obvious queries ("hello", "thanks", "plot a bar chart", "what is the
+average price") are resolved here in microseconds. The orchestrator only
+asks Gemini when the confidence returned by classify() is too low.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from .base_agent import BaseAgent
+
+
+# (agent name, pattern, confidence) - checked in order
+RULES: List[Tuple[str, re.Pattern, float]] = [
+    (
+        "AnswerSynthesiser",
+        re.compile(
+            r"^\s*(hi|hello|hey|thanks|thank you|thx|ok(ay)?|bye|goodbye|"
+            r"good (morning|afternoon|evening)|who are you|what can you do|help)"
+            r"[\s!.?]*$",
+            re.IGNORECASE,
+        ),
+        0.95,
+    ),
+    (
+        "DataVisualizer",
+        re.compile(
+            r"\b(plot|chart|graph|histogram|visuali[sz](e|ation))s?\b",
+            re.IGNORECASE,
+        ),
+        0.9,
+    ),
+]
+
+# Computation keywords only route confidently when there is data to compute on
+ANALYSIS_PATTERN = re.compile(
+    r"\b(mean|average|median|sum|total|count|maximum|minimum|max|min|std|"
+    r"variance|correlat\w*|group\s?by|describe|statistics?|how many|rows|columns)\b",
+    re.IGNORECASE,
+)
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "for", "to", "in", "on", "from",
+    "with", "as", "is", "are", "be", "me", "my", "i", "you", "it", "this",
+    "that", "what", "can", "please", "do", "some",
+}
+
+# Lexical scores below this are treated as weak evidence
+MIN_EVIDENCE = 2.0
+
+
+def _tokenize(text: str) -> List[str]:
+    tokens = []
+    for word in re.findall(r"[a-z]+", text.lower()):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s"):
+            word = word[:-1]
+        tokens.append(word[:5])
+    return tokens
+
+
+class FastRouter:
+    """Keyword/regex rules plus a small lexical model built from capabilities"""
+
+    def __init__(self, threshold: float = 0.75):
+        self.threshold = threshold
+        self.agent_names: List[str] = []
+        self.term_weights: Dict[str, Dict[str, float]] = {}
+
+    def train(self, agents: Dict[str, BaseAgent]):
+        """Build per-agent tf-idf term weights from get_capabilities()"""
+        self.agent_names = list(agents.keys())
+        term_counts = {
+            name: Counter(_tokenize(" ".join(agent.get_capabilities())))
+            for name, agent in agents.items()
+        }
+
+        document_frequency = Counter()
+        for counts in term_counts.values():
+            document_frequency.update(counts.keys())
+
+        total = len(term_counts)
+        self.term_weights = {
+            name: {
+                term: count * math.log(1 + total / document_frequency[term])
+                for term, count in counts.items()
+            }
+            for name, counts in term_counts.items()
+        }
+
+    def classify(self, message: str, has_data: bool = False) -> Tuple[Optional[str], float]:
+        """Return (agent name, confidence); agent name is None if nothing matched"""
+        for agent_name, pattern, confidence in RULES:
+            if agent_name in self.agent_names and pattern.search(message):
+                return agent_name, confidence
+
+        if "CodeInterpreter" in self.agent_names and ANALYSIS_PATTERN.search(message):
+            return "CodeInterpreter", 0.85 if has_data else 0.5
+
+        return self._lexical_match(message)
+
+    def _lexical_match(self, message: str) -> Tuple[Optional[str], float]:
+        tokens = _tokenize(message)
+        scores = {
+            name: sum(weights.get(token, 0.0) for token in tokens)
+            for name, weights in self.term_weights.items()
+        }
+        total = sum(scores.values())
+        if not total:
+            return None, 0.0
+
+        best = max(scores, key=scores.get)
+        share = scores[best] / total
+        evidence = min(1.0, scores[best] / MIN_EVIDENCE)
+        return best, share * evidence
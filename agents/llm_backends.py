@@ -0,0 +1,189 @@
+"""
+LLM Backends - Pluggable model backends used by LLMClient
+
+Set LLM_BACKEND=stub to run the whole system offline against the
+deterministic StubBackend (useful for load testing /chat and /upload).
+"""
+
+import asyncio
+import os
+import random
+import re
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, List, Optional, Tuple
+import google.generativeai as genai
+
+
+class LLMBackend(ABC):
+    """Base class for anything that turns a prompt into text"""
+
+    @abstractmethod
+    async def generate(self, prompt: str) -> str:
+        pass
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """Yield the response in chunks (default: one chunk)"""
+        yield await self.generate(prompt)
+
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini backend (blocking SDK call run in a worker thread)"""
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+
+    async def generate(self, prompt: str) -> str:
+        response = await asyncio.to_thread(self.model.generate_content, prompt)
+        return response.text
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        # The SDK's streaming iterator blocks, so drain it in a thread
+        # and hand chunks back to the event loop through a queue
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        def produce():
+            try:
+                for chunk in self.model.generate_content(prompt, stream=True):
+                    loop.call_soon_threadsafe(queue.put_nowait, chunk.text)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        producer = loop.run_in_executor(None, produce)
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+        await producer
+
+
+class StubBackend(LLMBackend):
+    """
+    Deterministic local stand-in for Gemini.
+
+    Responses come from, in order of preference:
+    1. rules - list of (regex, response) pairs matched against the prompt
+    2. responses - list of canned responses replayed in a cycle
+    3. built-in defaults that mimic the router, CodeInterpreter and
+       AnswerSynthesiser prompts (including a fenced python block)
+
+    Latency is simulated with asyncio.sleep so it never blocks the loop.
+    distribution is one of "fixed", "uniform", "normal" or "exponential";
+    jitter is the spread around latency (seconds).
+    """
+
+    DISTRIBUTIONS = ("fixed", "uniform", "normal", "exponential")
+
+    def __init__(
+        self,
+        responses: Optional[List[str]] = None,
+        rules: Optional[List[Tuple[str, str]]] = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        distribution: str = "fixed",
+        seed: int = 0,
+    ):
+        if distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {distribution}")
+
+        self.responses = responses or []
+        self.rules = [(re.compile(pattern, re.IGNORECASE), text) for pattern, text in (rules or [])]
+        self.latency = latency
+        self.jitter = jitter
+        self.distribution = distribution
+        self._random = random.Random(seed)
+        self._next_response = 0
+        self.call_count = 0
+
+    def _sample_delay(self) -> float:
+        if self.distribution == "uniform":
+            delay = self._random.uniform(self.latency - self.jitter, self.latency + self.jitter)
+        elif self.distribution == "normal":
+            delay = self._random.gauss(self.latency, self.jitter)
+        elif self.distribution == "exponential" and self.jitter > 0:
+            delay = self.latency + self._random.expovariate(1 / self.jitter)
+        else:
+            delay = self.latency
+        return max(delay, 0.0)
+
+    async def generate(self, prompt: str) -> str:
+        self.call_count += 1
+        delay = self._sample_delay()
+        if delay:
+            await asyncio.sleep(delay)
+        return self._respond(prompt)
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        # Same total latency as generate(), spread over word-sized chunks
+        self.call_count += 1
+        text = self._respond(prompt)
+        chunks = re.findall(r"\S+\s*|\s+", text) or [text]
+        delay = self._sample_delay() / len(chunks)
+        for chunk in chunks:
+            if delay:
+                await asyncio.sleep(delay)
+            yield chunk
+
+    def _respond(self, prompt: str) -> str:
+        for pattern, text in self.rules:
+            if pattern.search(prompt):
+                return text
+
+        if self.responses:
+            text = self.responses[self._next_response % len(self.responses)]
+            self._next_response += 1
+            return text
+
+        if "intelligent agent router" in prompt:
+            return self._route(prompt)
+        if "Python data analysis expert" in prompt:
+            return self._analyse(prompt)
+        if "SQL data analysis expert" in prompt:
+            return self._analyse_sql(prompt)
+        return "This is a stub answer.\n\n- The local stub backend is active."
+
+    def _route(self, prompt: str) -> str:
+        match = re.search(r'User Query: "(.*?)"', prompt, re.DOTALL)
+        query = match.group(1).lower() if match else ""
+        if re.search(r"\b(plot|chart|graph|visuali[sz]e)", query):
+            return "DataVisualizer"
+        if re.search(r"\b(mean|average|sum|count|analy[sz]e|statistic)", query):
+            return "CodeInterpreter"
+        return "AnswerSynthesiser"
+
+    def _analyse(self, prompt: str) -> str:
+        names = re.findall(r"^Variable: (\w+)$", prompt, re.MULTILINE)
+        if names:
+            code = f"print({names[0]}.describe())"
+        else:
+            code = 'print("No data loaded")'
+        return f"Here is a summary of the data.\n\n```python\n{code}\n```\n"
+
+    def _analyse_sql(self, prompt: str) -> str:
+        names = re.findall(r"^Table: (\w+)$", prompt, re.MULTILINE)
+        sql = f"SUMMARIZE {names[0]}" if names else "SELECT 'No data loaded' AS message"
+        return f"Here is a summary of the data.\n\n```sql\n{sql}\n```\n"
+
+
+def get_backend(model_name: str) -> LLMBackend:
+    """Create the backend selected by the LLM_BACKEND environment variable"""
+    backend = os.getenv("LLM_BACKEND", "gemini").lower()
+
+    if backend == "stub":
+        return StubBackend(
+            latency=float(os.getenv("LLM_STUB_LATENCY", "0")),
+            jitter=float(os.getenv("LLM_STUB_JITTER", "0")),
+            distribution=os.getenv("LLM_STUB_DISTRIBUTION", "fixed"),
+            seed=int(os.getenv("LLM_STUB_SEED", "0")),
+        )
+    if backend == "gemini":
+        return GeminiBackend(model_name)
+
+    raise ValueError(f"Unknown LLM_BACKEND: {backend}")
@@ -0,0 +1,91 @@
+"""
+LLM Client - Non-blocking Gemini calls shared by all agents
+"""
+
+import asyncio
+import weakref
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from .llm_backends import LLMBackend, get_backend
+from .response_cache import ResponseCache
+
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+DEFAULT_MAX_CONCURRENCY = 8
+
+# event loop -> (model name, max_concurrency) -> semaphore, shared by
+# every client with those settings. Kept per loop, because a semaphore
+# can only be used from the loop it was first used on.
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def _get_semaphore(model_name: str, max_concurrency: int) -> asyncio.Semaphore:
+    """Semaphore for the running event loop (call from a coroutine)"""
+    loop_semaphores: Dict[Tuple[str, int], asyncio.Semaphore] = _semaphores.setdefault(
+        asyncio.get_running_loop(), {}
+    )
+    key = (model_name, max_concurrency)
+    if key not in loop_semaphores:
+        loop_semaphores[key] = asyncio.Semaphore(max_concurrency)
+    return loop_semaphores[key]
+
+
+class LLMClient:
+    """
+    Async prompt -> text client.
+
+    The actual model call is delegated to a backend (Gemini by default,
+    see llm_backends.py). Blocking SDK calls run in a worker thread so
+    the event loop stays free for other requests, and concurrency is
+    capped per model so a burst of sessions can't open unlimited
+    connections.
+
+    With a ResponseCache, a prompt that was answered before is served
+    from the cache without calling the model (or taking the semaphore).
+    Cache reads and writes are SQLite calls, so they run in a thread too.
+    """
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL,
+        max_concurrency: Optional[int] = None,
+        backend: Optional[LLMBackend] = None,
+        cache: Optional[ResponseCache] = None,
+    ):
+        self.model_name = model_name
+        self.backend = backend or get_backend(model_name)
+        self.max_concurrency = max_concurrency or DEFAULT_MAX_CONCURRENCY
+        self.cache = cache
+
+    async def generate(self, prompt: str) -> str:
+        """Send a prompt and return the response text"""
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, self.model_name, prompt)
+            if cached is not None:
+                return cached
+
+        semaphore = _get_semaphore(self.model_name, self.max_concurrency)
+        async with semaphore:
+            response = await self.backend.generate(prompt)
+
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.set, self.model_name, prompt, response)
+        return response
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """Send a prompt and yield the response text as it arrives"""
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, self.model_name, prompt)
+            if cached is not None:
+                yield cached
+                return
+
+        chunks = []
+        semaphore = _get_semaphore(self.model_name, self.max_concurrency)
+        async with semaphore:
+            async for chunk in self.backend.stream(prompt):
+                chunks.append(chunk)
+                yield chunk
+
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.set, self.model_name, prompt, "".join(chunks))
@@ -3,7 +3,9 @@ Agent Orchestrator - Manages agents and routes queries
 This file shows how to register your custom agents!
 """
 
-from typing import Dict, Any, List, Optional
+import asyncio
+import itertools
+from typing import AsyncIterator, Awaitable, Callable, Dict, Any, List, Mapping, Optional, Set
 from datetime import datetime
 import google.generativeai as genai
 
@@ -11,8 +13,15 @@ from .base_agent import BaseAgent, AgentResult
 from .code_interpreter import CodeInterpreterAgent
 from .answer_synthesiser import AnswerSynthesiserAgent
 from .data_visualization_agent import DataVisualizationAgent
+from .llm_client import LLMClient
+from .fast_router import FastRouter
+from .caching import TTLCache, normalize_query
+from .session_context import SessionContextStore
 
 
+# Receives streaming progress events: emit(event_name, data)
+EmitCallback = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
 
 class AgentOrchestrator:
     """Manages all agents and routes queries to the right one"""
@@ -20,7 +29,7 @@ class AgentOrchestrator:
     def __init__(self, api_key: str):
         self.api_key = api_key
         genai.configure(api_key=api_key)
-        self.routing_model = genai.GenerativeModel("gemini-2.5-flash")
+        self.routing_llm = LLMClient("gemini-2.5-flash")
 
         # ============================================
         # REGISTER AGENTS HERE
@@ -37,7 +46,20 @@ class AgentOrchestrator:
         }
 
         self.execution_history: List[Dict[str, Any]] = []
-        self.current_context: Dict[str, Any] = {}
+        self.contexts = SessionContextStore()
+
+        # Local classifier consulted before the LLM router
+        self.fast_router = FastRouter()
+        self.fast_router.train(self.agents)
+        # LLM routing decisions, keyed by normalized query + context + agent set
+        self.routing_cache = TTLCache(maxsize=1024, ttl=3600)
+        self.routing_stats: Dict[str, int] = {
+            "total": 0,
+            "files": 0,
+            "fast_path": 0,
+            "cache": 0,
+            "llm": 0,
+        }
 
     def get_agent(self, agent_name: str) -> Optional[BaseAgent]:
         """Get an agent by name"""
@@ -50,6 +72,17 @@ class AgentOrchestrator:
     def register_agent(self, name: str, agent: BaseAgent):
         """Register a new agent dynamically"""
         self.agents[name] = agent
+        self.fast_router.train(self.agents)
+        self.routing_cache.clear()
+
+    def get_routing_stats(self) -> Dict[str, Any]:
+        """Routing counters and fast-path hit rate"""
+        stats = dict(self.routing_stats)
+        routed = stats["fast_path"] + stats["cache"] + stats["llm"]
+        stats["fast_path_hit_rate"] = stats["fast_path"] / routed if routed else 0.0
+        stats["cache_hit_rate"] = stats["cache"] / routed if routed else 0.0
+        stats["cache_size"] = len(self.routing_cache)
+        return stats
 
     async def process_query(
         self,
@@ -57,19 +90,27 @@ class AgentOrchestrator:
         files: Optional[Dict[str, str]] = None,
         start_agent: str = "CodeInterpreter",
         session_id: Optional[str] = None,
+        emit: Optional[EmitCallback] = None,
     ) -> Dict[str, Any]:
-        """Process a query through the agent system"""
+        """
+        Process a query through the agent system.
+        If emit is given, progress events are sent to it as they happen.
+        """
 
         if files is None:
             files = {}
 
         execution_start = datetime.now()
 
+        session_id = session_id or "default"
+
         input_data = {
             "query": query,
-            "context": self.current_context.copy(),
+            # Shallow copy of this session's context only
+            "context": dict(self.contexts.snapshot(session_id)),
             "files": files,
-            "session_id": session_id or "default",
+            "session_id": session_id,
+            "emit": emit,
         }
 
         results = {
@@ -93,15 +134,26 @@ class AgentOrchestrator:
                 if not agent:
                     raise ValueError(f"Agent {current_agent_name} not found")
 
-                results["execution_flow"].append(
-                    {
-                        "agent": current_agent_name,
-                        "timestamp": datetime.now().isoformat(),
-                    }
-                )
+                step = {
+                    "agent": current_agent_name,
+                    "timestamp": datetime.now().isoformat(),
+                }
+                results["execution_flow"].append(step)
+                if emit:
+                    await emit("agent_start", step)
 
                 # Process with the agent
                 agent_result = await agent.process(input_data)
+                if emit:
+                    await emit(
+                        "agent_end",
+                        {
+                            "agent": current_agent_name,
+                            "success": agent_result.success,
+                            "message": agent_result.message,
+                            "next_agent": agent_result.next_agent,
+                        },
+                    )
 
                 results["agent_results"][current_agent_name] = {
                     "success": agent_result.success,
@@ -133,6 +185,7 @@ class AgentOrchestrator:
             execution_end = datetime.now()
             self.execution_history.append(
                 {
+                    "seq": len(self.execution_history),
                     "timestamp": execution_start.isoformat(),
                     "duration": (execution_end - execution_start).total_seconds(),
                     "query": query,
@@ -155,30 +208,98 @@ class AgentOrchestrator:
         files: Optional[Dict[str, str]] = None,
         conversation_context: Optional[Dict[str, Any]] = None,
         session_id: Optional[str] = None,
+        emit: Optional[EmitCallback] = None,
     ) -> Dict[str, Any]:
         """Chat interface - determines which agent to start with"""
-        start_agent = self._determine_start_agent(message, files)
+        session_id = session_id or "default"
         if conversation_context:
-            self.current_context.update(conversation_context)
+            self.contexts.update(session_id, conversation_context)
+
+        context = self.contexts.snapshot(session_id)
+        start_agent = await self._determine_start_agent(message, files, context)
+        if emit:
+            await emit("route", {"agent": start_agent})
+
+        return await self.process_query(message, files, start_agent, session_id, emit)
+
+    async def stream_chat(
+        self,
+        message: str,
+        files: Optional[Dict[str, str]] = None,
+        conversation_context: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming version of chat().
+        Yields {"event": ..., "data": ...} dicts as agents make progress;
+        the last event is "result" (same dict chat() returns) or "error".
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def emit(event: str, data: Dict[str, Any]):
+            await queue.put({"event": event, "data": data})
+
+        async def run():
+            try:
+                results = await self.chat(
+                    message, files, conversation_context, session_id, emit
+                )
+                await queue.put({"event": "result", "data": results})
+            except Exception as e:
+                await queue.put({"event": "error", "data": {"error": str(e)}})
+            finally:
+                await queue.put(None)
 
-        return await self.process_query(message, files, start_agent, session_id)
+        task = asyncio.create_task(run())
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                yield item
+        finally:
+            # Client went away before the chain finished
+            if not task.done():
+                task.cancel()
 
-    def _determine_start_agent(
-        self, message: str, files: Optional[Dict[str, str]]
+    async def _determine_start_agent(
+        self,
+        message: str,
+        files: Optional[Dict[str, str]],
+        context: Mapping[str, Any],
     ) -> str:
+        self.routing_stats["total"] += 1
         if files:
+            self.routing_stats["files"] += 1
             return "CodeInterpreter"
 
+        has_data = bool(
+            context.get("dataframes")
+            or context.get("codeinterpreter_data")
+        )
+        fast_agent, confidence = self.fast_router.classify(message, has_data)
+        if fast_agent and confidence >= self.fast_router.threshold:
+            self.routing_stats["fast_path"] += 1
+            return fast_agent
+
         context_info = []
-        if self.current_context.get("dataframes"):
+        if context.get("dataframes"):
             context_info.append("- Data/DataFrames are already loaded in context")
-        if self.current_context.get("codeinterpreter_data"):
+        if context.get("codeinterpreter_data"):
             context_info.append("- Code analysis has been performed")
-        if self.current_context.get("visualizationagent_data"):
+        if context.get("visualizationagent_data"):
             context_info.append("- Visualizations have been created")
 
         context_str = "\n".join(context_info) if context_info else "- No prior context"
 
+        cache_key = (normalize_query(message), context_str, tuple(sorted(self.agents)))
+        cached_agent = self.routing_cache.get(cache_key)
+        if cached_agent in self.agents:
+            self.routing_stats["cache"] += 1
+            return cached_agent
+
+        self.routing_stats["llm"] += 1
+
         agent_descriptions = []
         for agent_name, agent in self.agents.items():
             capabilities = agent.get_capabilities()
@@ -220,14 +341,16 @@ class AgentOrchestrator:
                         Your response (agent name only):"""
 
         try:
-            response = self.routing_model.generate_content(prompt)
-            selected_agent = response.text.strip()
+            response_text = await self.routing_llm.generate(prompt)
+            selected_agent = response_text.strip()
 
             if selected_agent in self.agents:
+                self.routing_cache.set(cache_key, selected_agent)
                 return selected_agent
             else:
                 for agent_name in self.agents.keys():
                     if agent_name.lower() in selected_agent.lower():
+                        self.routing_cache.set(cache_key, agent_name)
                         return agent_name
                 print(
                     f"Warning: Gemini returned invalid agent '{selected_agent}', defaulting to CodeInterpreter"
@@ -240,12 +363,56 @@ class AgentOrchestrator:
             )
             return "CodeInterpreter"
 
-    def clear_context(self):
-        """Clear all context"""
-        self.current_context = {}
+    def clear_context(self, session_id: Optional[str] = None):
+        """Clear one session's context, or all context if no session is given"""
+        if session_id is not None:
+            self.contexts.drop(session_id)
+            return
+
+        self.contexts.clear()
         for agent in self.agents.values():
             agent.clear_history()
 
-    def get_execution_history(self) -> List[Dict[str, Any]]:
-        """Get execution history"""
-        return self.execution_history
+    def startup(self):
+        """Let agents start background resources"""
+        for agent in self.agents.values():
+            agent.startup()
+
+    def shutdown(self):
+        """Let agents release background resources"""
+        for agent in self.agents.values():
+            agent.shutdown()
+
+    def end_session(self, session_id: str):
+        """Release everything held for a session"""
+        self.contexts.drop(session_id)
+        for agent in self.agents.values():
+            agent.end_session(session_id)
+
+    def active_sessions(self) -> Set[str]:
+        """Sessions this process holds context or agent state for"""
+        session_ids = set(self.contexts.session_ids())
+        for agent in self.agents.values():
+            session_ids.update(agent.active_sessions())
+        return session_ids
+
+    def get_execution_history(
+        self,
+        after: Optional[int] = None,
+        limit: Optional[int] = None,
+        since: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Get execution history, oldest first.
+
+        after: only entries with seq > after (cursor)
+        limit: maximum number of entries
+        since: only entries whose ISO timestamp is later than this
+        """
+        start = after + 1 if after is not None else 0
+        entries = itertools.islice(self.execution_history, start, None)
+        if since is not None:
+            # Entries are appended when a query finishes, so start
+            # timestamps are not strictly ordered
+            entries = (entry for entry in entries if entry["timestamp"] > since)
+        return list(itertools.islice(entries, limit))
@@ -0,0 +1,127 @@
+"""
+Plot Renderer - Thread-safe chart rendering
+
+Charts are drawn on their own matplotlib Figure with an Agg canvas, never
+through pyplot, so there is no shared global figure state and several
+charts can be rendered at once. Rendering runs in a small thread pool,
+which keeps the event loop free and bounds how many renders (and how
+much memory) are in flight. Large series are downsampled first (see
+downsample.py), in the same thread.
+"""
+
+import asyncio
+import io
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from .downsample import DownsampleConfig, PlotData, reduce_for_plot
+
+
+PLOT_TYPES = ("line", "bar", "scatter")
+
+
+@dataclass(frozen=True)
+class PlotSpec:
+    """What to draw and how"""
+
+    x: str
+    y: str
+    plot_type: str = "line"
+    figsize: Tuple[float, float] = (8, 5)
+    dpi: int = 100
+    format: str = "png"
+
+    @property
+    def title(self) -> str:
+        return f"{self.plot_type.capitalize()} plot of {self.y} vs {self.x}"
+
+
+@dataclass
+class RenderedPlot:
+    image: bytes
+    format: str
+    width: int  # pixels
+    height: int
+    reduction: Optional[Dict[str, Any]] = None  # how the data was downsampled, if it was
+
+
+class PlotRenderer:
+    """Renders PlotSpecs in a bounded thread pool"""
+
+    def __init__(self, max_workers: int = 2):
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def render(
+        self,
+        x_values: np.ndarray,
+        y_values: np.ndarray,
+        spec: PlotSpec,
+        downsample: Optional[DownsampleConfig] = None,
+    ) -> RenderedPlot:
+        if spec.plot_type not in PLOT_TYPES:
+            raise ValueError(f"Unsupported plot type: {spec.plot_type}")
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="plot"
+            )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, reduce_and_render, x_values, y_values, spec, downsample
+        )
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+def reduce_and_render(
+    x_values: np.ndarray,
+    y_values: np.ndarray,
+    spec: PlotSpec,
+    downsample: Optional[DownsampleConfig] = None,
+) -> RenderedPlot:
+    reduction = None
+    if downsample is not None:
+        data, reduction = reduce_for_plot(x_values, y_values, spec.plot_type, downsample)
+    else:
+        data = PlotData(x_values, y_values)
+    plot = render_plot(data, spec)
+    plot.reduction = reduction
+    return plot
+
+
+def render_plot(data: PlotData, spec: PlotSpec) -> RenderedPlot:
+    """Draw one chart on a private Figure (safe to call from any thread)"""
+    figure = Figure(figsize=spec.figsize, dpi=spec.dpi)
+    canvas = FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+
+    if data.density is not None:
+        counts, x_edges, y_edges = data.density
+        # Empty bins stay blank instead of taking the lowest color
+        mesh = axes.pcolormesh(
+            x_edges, y_edges, np.ma.masked_equal(counts.T, 0), cmap="viridis"
+        )
+        figure.colorbar(mesh, ax=axes, label="points")
+    elif spec.plot_type == "line":
+        axes.plot(data.x, data.y)
+    elif spec.plot_type == "bar":
+        axes.bar(data.x, data.y)
+    elif spec.plot_type == "scatter":
+        axes.scatter(data.x, data.y)
+
+    axes.set_xlabel(spec.x)
+    axes.set_ylabel(spec.y)
+    axes.set_title(spec.title)
+
+    buffer = io.BytesIO()
+    canvas.print_figure(buffer, format=spec.format, dpi=spec.dpi)
+    width, height = (int(round(size * spec.dpi)) for size in spec.figsize)
+    return RenderedPlot(buffer.getvalue(), spec.format, width, height)
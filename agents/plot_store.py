@@ -0,0 +1,169 @@
+"""
+Plot Store - Rendered charts saved as content-addressed files
+
+A chart is written once to <root>/<sha256>.<format> and served by the API
+under url_prefix, so responses carry a short URL instead of the image
+itself. The file name is the hash of its bytes, which makes it safe to
+cache forever on the client.
+
+The store doubles as a render cache: save() can record the render key
+(dataset fingerprint + plot spec) that produced a file, and lookup()
+finds it again without reading the data or calling matplotlib. The index
+lives in <root>/index.db; files are evicted least recently used first
+once they take more than max_bytes.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from .plot_renderer import RenderedPlot
+
+
+def render_key(*parts: Any) -> str:
+    """Stable cache key for everything that determines a chart's pixels"""
+    return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()
+
+
+class PlotStore:
+    def __init__(
+        self,
+        root: Union[str, Path] = "visualizations",
+        url_prefix: str = "/plots",
+        max_bytes: int = 256 * 1024 * 1024,
+    ):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.url_prefix = url_prefix.rstrip("/")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(
+            str(self.root / "index.db"), check_same_thread=False, timeout=30
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                filename TEXT PRIMARY KEY,
+                format TEXT NOT NULL,
+                width INTEGER NOT NULL,
+                height INTEGER NOT NULL,
+                bytes INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS files_last_access ON files (last_access);
+            CREATE TABLE IF NOT EXISTS renders (
+                key TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                reduction TEXT
+            );
+            CREATE INDEX IF NOT EXISTS renders_filename ON renders (filename);
+            """
+        )
+        self._conn.commit()
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """Metadata of the plot rendered for key, or None"""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT f.filename, f.format, f.width, f.height, f.bytes, r.reduction "
+                "FROM renders r JOIN files f ON f.filename = r.filename WHERE r.key = ?",
+                (key,),
+            ).fetchone()
+            if row is None or not (self.root / row[0]).exists():
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE files SET last_access = ? WHERE filename = ?", (time.time(), row[0])
+            )
+            self.hits += 1
+        filename, fmt, width, height, size, reduction = row
+        info = self._info(filename, fmt, width, height, size)
+        info["reduction"] = json.loads(reduction) if reduction else None
+        return info
+
+    def save(self, plot: RenderedPlot, key: Optional[str] = None) -> Dict[str, Any]:
+        """Write a plot (if not already stored) and return its metadata"""
+        digest = hashlib.sha256(plot.image).hexdigest()
+        filename = f"{digest}.{plot.format}"
+        path = self.root / filename
+        if not path.exists():
+            temp_path = self.root / f".{filename}.{uuid.uuid4().hex}.tmp"
+            try:
+                temp_path.write_bytes(plot.image)
+                os.replace(temp_path, path)
+            finally:
+                temp_path.unlink(missing_ok=True)
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files "
+                "(filename, format, width, height, bytes, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                (filename, plot.format, plot.width, plot.height, len(plot.image), time.time()),
+            )
+            if key is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO renders (key, filename, reduction) VALUES (?, ?, ?)",
+                    (key, filename, json.dumps(plot.reduction) if plot.reduction else None),
+                )
+            self._evict(keep=filename)
+
+        info = self._info(filename, plot.format, plot.width, plot.height, len(plot.image))
+        info["reduction"] = plot.reduction
+        return info
+
+    def _info(self, filename: str, fmt: str, width: int, height: int, size: int) -> Dict[str, Any]:
+        return {
+            "plot_url": f"{self.url_prefix}/{filename}",
+            "plot_hash": filename.rsplit(".", 1)[0],
+            "format": fmt,
+            "width": width,
+            "height": height,
+            "bytes": size,
+        }
+
+    def _evict(self, keep: str):
+        total = self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM files").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        doomed = []
+        for filename, size in self._conn.execute(
+            "SELECT filename, bytes FROM files ORDER BY last_access"
+        ):
+            if filename == keep:
+                continue
+            doomed.append(filename)
+            excess -= size
+            if excess <= 0:
+                break
+        for filename in doomed:
+            self._conn.execute("DELETE FROM files WHERE filename = ?", (filename,))
+            self._conn.execute("DELETE FROM renders WHERE filename = ?", (filename,))
+            (self.root / filename).unlink(missing_ok=True)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            files, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM files"
+            ).fetchone()
+        return {
+            "files": files,
+            "total_bytes": total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
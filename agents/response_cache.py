@@ -0,0 +1,150 @@
+"""
+Response Cache - Persistent cache of LLM responses
+
+Responses are stored in a local SQLite file keyed by model name and the
+normalized prompt, so the same question about the same dataset profile
+skips the model call, even after a restart. Entries expire after ttl
+seconds and the least recently used are evicted once the stored text
+goes over max_bytes.
+
+Configured from the environment by get_response_cache():
+    LLM_CACHE_PATH          SQLite file (default llm_cache.db, "off" disables)
+    LLM_CACHE_TTL_SECONDS   default 7 days
+    LLM_CACHE_MAX_BYTES     default 64 MB
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so formatting-only differences share an entry"""
+    return _WHITESPACE.sub(" ", prompt).strip()
+
+
+def cache_key(model_name: str, prompt: str) -> str:
+    text = f"{model_name}\n{normalize_prompt(prompt)}"
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed prompt -> response cache, safe to share between threads"""
+
+    def __init__(
+        self,
+        path: str = "llm_cache.db",
+        ttl: Optional[float] = 7 * 24 * 3600,
+        max_bytes: int = 64 * 1024 * 1024,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                bytes INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access);
+            """
+        )
+        self._conn.commit()
+
+    def get(self, model_name: str, prompt: str) -> Optional[str]:
+        key = cache_key(model_name, prompt)
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl is not None and row[1] + self.ttl < now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def set(self, model_name: str, prompt: str, response: str):
+        size = len(response.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, model, response, bytes, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (cache_key(model_name, prompt), model_name, response, size, now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now: float):
+        if self.ttl is not None:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+
+        total = self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used entries until we're back under max_bytes
+        excess = total - self.max_bytes
+        doomed = []
+        for key, size in self._conn.execute(
+            "SELECT key, bytes FROM responses ORDER BY last_access"
+        ):
+            doomed.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM responses"
+            ).fetchone()
+        return {
+            "entries": entries,
+            "total_bytes": total,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Response cache configured from LLM_CACHE_* environment variables"""
+    path = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+    if not path or path.lower() == "off":
+        return None
+    return ResponseCache(
+        path=path,
+        ttl=float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+        max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    )
@@ -12,6 +12,7 @@ To use this agent:
 import google.generativeai as genai
 from typing import Dict, Any, List
 from .base_agent import BaseAgent, AgentResult
+from .llm_client import LLMClient
 
 
 class SampleCustomAgent(BaseAgent):
@@ -30,8 +31,9 @@ class SampleCustomAgent(BaseAgent):
         super().__init__(name="SampleCustomAgent", api_key=api_key)
 
         # Initialize Gemini if you need AI capabilities
+        # (LLMClient calls are async, so they never block other requests)
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel("gemini-2.0-flash")
+        self.llm = LLMClient("gemini-2.0-flash")
 
         # Add any other initialization here
         # self.my_data = {}
@@ -79,8 +81,7 @@ class SampleCustomAgent(BaseAgent):
             Provide a clear, concise answer:
             """
 
-            response = self.model.generate_content(prompt)
-            answer = response.text
+            answer = await self.llm.generate(prompt)
 
             # ============================================
             # Return the result
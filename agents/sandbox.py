@@ -0,0 +1,369 @@
+"""
+Sandbox - Warm worker processes for running generated code
+
+Generated code runs in a small pool of pre-started worker processes
+instead of on the API's event loop. Workers are forked from a forkserver
+that has already imported pandas and numpy, so starting (or replacing)
+one is cheap. Each worker loads the session's files itself, preferring
+the memory-mapped Arrow sidecar written at upload time, and keeps the
+most recently used ones cached between tasks (up to cache_bytes per
+worker). stdout/stderr are captured inside the worker, so concurrent
+executions never interleave their output.
+
+The app starts the workers at startup (CodeInterpreterAgent.startup()),
+so they are warm before the first request; a pool that wasn't started is
+started by the first run(), off the event loop. Like any use of
+multiprocessing, a script that starts the pool (e.g. a TestClient script
+entering the app's lifespan) needs an `if __name__ == "__main__":` guard,
+because the workers re-import the main module.
+
+Every task runs under ExecutionLimits: a wall-clock timeout enforced by
+the parent (the worker is killed and replaced), plus CPU-time and
+address-space rlimits set inside the worker before it loads the task's
+data.
+"""
+
+import asyncio
+import io
+import multiprocessing
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+# How often the parent checks for a result, a timeout or a cancellation
+POLL_INTERVAL = 0.05
+
+
+@dataclass
+class ExecutionLimits:
+    """Limits for one execution; None disables a limit"""
+
+    timeout_seconds: Optional[float] = 30.0  # Wall clock, enforced by the parent
+    cpu_seconds: Optional[int] = 20  # CPU time, RLIMIT_CPU in the worker
+    memory_bytes: Optional[int] = 1024 * 1024 * 1024  # Extra address space, RLIMIT_AS
+
+
+class CPULimitExceeded(Exception):
+    pass
+
+
+def _on_cpu_limit(signum, frame):
+    raise CPULimitExceeded()
+
+
+def _address_space_in_use() -> int:
+    """Current virtual memory size of this process (0 if unknown)"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[0])
+        return pages * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _apply_limits(limits: Dict[str, Any]):
+    if resource is None:
+        return
+    if limits.get("cpu_seconds"):
+        used = resource.getrusage(resource.RUSAGE_SELF)
+        soft = int(used.ru_utime + used.ru_stime) + int(limits["cpu_seconds"]) + 1
+        hard = resource.getrlimit(resource.RLIMIT_CPU)[1]
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+    if limits.get("memory_bytes"):
+        # Relative to what the worker already maps (pandas, numpy, cached frames)
+        soft = _address_space_in_use() + int(limits["memory_bytes"])
+        hard = resource.getrlimit(resource.RLIMIT_AS)[1]
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+
+
+def _clear_limits():
+    if resource is None:
+        return
+    for limit in (resource.RLIMIT_CPU, resource.RLIMIT_AS):
+        hard = resource.getrlimit(limit)[1]
+        resource.setrlimit(limit, (hard, hard))
+
+
+def _worker_main(conn, cache_bytes: int):
+    """Worker loop: receive a task, run it, send back the result"""
+    import signal
+
+    import numpy as np
+    import pandas as pd
+
+    from .chunked import ChunkedTable
+    from .code_cache import CompileCache
+    from .columnar import load_frame
+    from .dataframe_cache import file_fingerprint
+
+    # path -> (fingerprint, DataFrame, size), least recently used first
+    loaded: "OrderedDict[str, Any]" = OrderedDict()
+    compiled_code = CompileCache()
+
+    if hasattr(signal, "SIGXCPU"):
+        signal.signal(signal.SIGXCPU, _on_cpu_limit)
+
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if task is None:
+            break
+
+        result = {
+            "code": task["code"],
+            "success": False,
+            "output": "",
+            "error": None,
+            "status": "error",
+            "cache": {"compile": "miss"},
+        }
+        # The limits cover loading the data as well as running the code
+        _apply_limits(task["limits"])
+        try:
+            exec_globals = {"pd": pd, "np": np}
+            copies: Dict[str, Any] = {}
+            for name, path in task["frames"].items():
+                if path in task["chunked"]:
+                    # Streamed from disk, never loaded whole
+                    exec_globals[name] = ChunkedTable(path, task["chunk_rows"])
+                    continue
+                if path not in copies:
+                    fingerprint = file_fingerprint(path)
+                    cached = loaded.pop(path, None)
+                    if cached is None or cached[0] != fingerprint:
+                        df = load_frame(path)
+                        cached = (fingerprint, df, int(df.memory_usage(deep=True).sum()))
+                    loaded[path] = cached
+                    # Fresh copy per task so one execution can't leak into the next
+                    copies[path] = cached[1].copy()
+                exec_globals[name] = copies[path]
+            _evict_frames(loaded, cache_bytes, keep=set(copies))
+
+            stdout_capture = io.StringIO()
+            stderr_capture = io.StringIO()
+            try:
+                compiled, hit = compiled_code.compile(task["code"])
+                result["cache"]["compile"] = "hit" if hit else "miss"
+                with redirect_stdout(stdout_capture), redirect_stderr(stderr_capture):
+                    exec(compiled, exec_globals)
+                result["success"] = True
+                result["status"] = "ok"
+                result["output"] = stdout_capture.getvalue()
+            except CPULimitExceeded:
+                result["status"] = "timeout"
+                result["error"] = "Execution exceeded its CPU time limit"
+                result["output"] = stdout_capture.getvalue()
+            except MemoryError:
+                result["status"] = "oom"
+                result["error"] = _memory_error(task["limits"], "Execution")
+                result["output"] = stdout_capture.getvalue()
+            except Exception as e:
+                result["error"] = str(e)
+                result["output"] = stderr_capture.getvalue()
+            del exec_globals, copies
+        except CPULimitExceeded:
+            result["status"] = "timeout"
+            result["error"] = "Loading the data exceeded the CPU time limit"
+        except MemoryError:
+            result["status"] = "oom"
+            result["error"] = _memory_error(task["limits"], "Loading the data")
+        except Exception as e:
+            result["error"] = f"Sandbox error: {str(e)}"
+        finally:
+            _clear_limits()
+
+        conn.send(result)
+
+
+def _memory_error(limits: Dict[str, Any], what: str) -> str:
+    if limits.get("memory_bytes"):
+        return f"{what} exceeded the memory limit"
+    return f"{what} ran out of memory"
+
+
+def _evict_frames(loaded: "OrderedDict[str, Any]", cache_bytes: int, keep: set):
+    """Drop least recently used frames until the cache fits in cache_bytes"""
+    total = sum(entry[2] for entry in loaded.values())
+    for path in list(loaded):
+        if total <= cache_bytes:
+            break
+        if path not in keep:
+            total -= loaded.pop(path)[2]
+
+
+def _get_context():
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["numpy", "pandas", "agents.sandbox"])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+class _Worker:
+    def __init__(self, context, cache_bytes: int):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, cache_bytes), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class SandboxPool:
+    """
+    Fixed-size pool of code-execution worker processes.
+
+    run() is async: a dedicated thread waits for an idle worker and for
+    its result, so the event loop is never blocked. Call start() up
+    front to have warm workers; otherwise the first run() starts them.
+    """
+
+    def __init__(self, size: int = 2, cache_bytes: int = 256 * 1024 * 1024):
+        self.size = size
+        # Loaded files each worker keeps between tasks
+        self.cache_bytes = cache_bytes
+        self._context = None
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._workers: List[_Worker] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def started(self) -> bool:
+        return self._executor is not None
+
+    def start(self):
+        """Start the workers (safe to call more than once)"""
+        with self._lock:
+            if self.started:
+                return
+            self._context = _get_context()
+            for _ in range(self.size):
+                worker = _Worker(self._context, self.cache_bytes)
+                self._workers.append(worker)
+                self._idle.put(worker)
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.size, thread_name_prefix="sandbox"
+            )
+
+    def stop(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        # Outside the lock: a running task may still need it to replace its worker
+        executor.shutdown(wait=True)
+        with self._lock:
+            for worker in self._workers:
+                worker.stop()
+            self._workers = []
+            self._idle = queue.Queue()
+
+    async def run(
+        self,
+        code: str,
+        frames: Dict[str, str],
+        limits: Optional[ExecutionLimits] = None,
+        chunked_paths: Optional[List[str]] = None,
+        chunk_rows: int = 100_000,
+    ) -> Dict[str, Any]:
+        """
+        Execute code with the given DataFrames (variable name -> file path).
+        Files in chunked_paths are exposed as ChunkedTables instead.
+        Returns {"code", "success", "output", "error", "status"}, where
+        status is "ok", "error", "timeout", "oom" or "crashed".
+
+        Cancelling the awaiting task kills the worker running the code.
+        """
+        if not self.started:
+            # Starting the forkserver and forking the workers takes a while
+            await asyncio.to_thread(self.start)
+        limits = limits or ExecutionLimits()
+        task = {
+            "code": code,
+            "frames": frames,
+            "chunked": set(chunked_paths or ()),
+            "chunk_rows": chunk_rows,
+            "limits": {"cpu_seconds": limits.cpu_seconds, "memory_bytes": limits.memory_bytes},
+        }
+        cancelled = threading.Event()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self._executor, self._run_blocking, task, limits.timeout_seconds, cancelled
+        )
+        try:
+            return await future
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    def _run_blocking(
+        self, task: Dict[str, Any], timeout: Optional[float], cancelled: threading.Event
+    ) -> Dict[str, Any]:
+        worker = self._idle.get()
+        if cancelled.is_set():
+            self._idle.put(worker)
+            return _failed(task, "cancelled", "Execution was cancelled")
+
+        deadline = time.monotonic() + timeout if timeout else None
+        try:
+            worker.conn.send(task)
+            while not worker.conn.poll(POLL_INTERVAL):
+                if cancelled.is_set():
+                    worker = self._replace(worker)
+                    return _failed(task, "cancelled", "Execution was cancelled")
+                if deadline is not None and time.monotonic() > deadline:
+                    worker = self._replace(worker)
+                    return _failed(task, "timeout", f"Execution timed out after {timeout:g}s")
+            return worker.conn.recv()
+        except (EOFError, OSError) as e:
+            # The worker died mid-task: replace it
+            worker = self._replace(worker)
+            return _failed(
+                task, "crashed", f"Execution worker crashed ({str(e) or type(e).__name__})"
+            )
+        finally:
+            self._idle.put(worker)
+
+    def _replace(self, worker: _Worker) -> _Worker:
+        if worker.process.is_alive():
+            worker.process.kill()
+        worker.process.join()
+        worker.conn.close()
+
+        replacement = _Worker(self._context, self.cache_bytes)
+        with self._lock:
+            self._workers = [w for w in self._workers if w is not worker] + [replacement]
+        return replacement
+
+
+def _failed(task: Dict[str, Any], status: str, error: str) -> Dict[str, Any]:
+    return {"code": task["code"], "success": False, "output": "", "error": error, "status": status}
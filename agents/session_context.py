@@ -0,0 +1,48 @@
+"""
+Session Context Store - Orchestrator context scoped by session_id
+"""
+
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping
+
+
+_EMPTY: Mapping[str, Any] = MappingProxyType({})
+
+
+class SessionContextStore:
+    """
+    Holds one context dict per session.
+
+    Stored dicts are never mutated in place: update() builds a new dict
+    and swaps it in, so a snapshot handed to a running request stays
+    consistent and can be read without copying. A request only ever
+    touches its own session's keys.
+    """
+
+    def __init__(self):
+        self._contexts: Dict[str, Mapping[str, Any]] = {}
+
+    def snapshot(self, session_id: str) -> Mapping[str, Any]:
+        """Read-only view of a session's context"""
+        return self._contexts.get(session_id, _EMPTY)
+
+    def update(self, session_id: str, updates: Mapping[str, Any]):
+        """Merge updates into a session's context (copy-on-write)"""
+        current = self._contexts.get(session_id, _EMPTY)
+        self._contexts[session_id] = MappingProxyType({**current, **updates})
+
+    def session_ids(self) -> List[str]:
+        return list(self._contexts)
+
+    def drop(self, session_id: str):
+        """Forget a session's context"""
+        self._contexts.pop(session_id, None)
+
+    def clear(self):
+        self._contexts = {}
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._contexts
+
+    def __len__(self) -> int:
+        return len(self._contexts)
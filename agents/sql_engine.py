@@ -0,0 +1,155 @@
+"""
+SQL Engine - Runs generated SQL with DuckDB over the uploaded files
+
+Each session file becomes a view: the memory-mapped Arrow sidecar when
+there is one (registered as an Arrow table, so DuckDB scans it in place
+with projection and filter pushdown), the CSV through DuckDB's CSV reader
+otherwise. Nothing is loaded into pandas first; only the (row-capped)
+result is.
+
+Once the views exist the connection is locked down: the session's files
+are the only paths it may read, and external access (COPY ... TO,
+read_text, ATTACH, INSTALL/LOAD) and configuration changes are disabled
+for the generated SQL.
+
+duckdb is optional: without it SQL mode reports an error result.
+"""
+
+import re
+import threading
+from typing import Any, Dict, Optional
+
+from .columnar import feather, has_fresh_sidecar, sidecar_path
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+
+# Table names must be plain identifiers; they come from upload filenames
+TABLE_NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+
+class SQLEngine:
+    """Executes SQL statements against a session's files"""
+
+    def __init__(self, threads: Optional[int] = None, max_result_rows: int = 200):
+        self.threads = threads
+        self.max_result_rows = max_result_rows
+
+    @property
+    def available(self) -> bool:
+        return duckdb is not None
+
+    def connect(self, tables: Dict[str, str], memory_bytes: Optional[int] = None):
+        """Locked-down in-memory DuckDB connection with one view per table (name -> file path)"""
+        conn = duckdb.connect(":memory:")
+        if self.threads:
+            conn.execute(f"SET threads = {int(self.threads)}")
+        if memory_bytes:
+            conn.execute(f"SET memory_limit = '{int(memory_bytes) // (1024 * 1024)}MB'")
+
+        for name, path in tables.items():
+            if not TABLE_NAME.fullmatch(name):
+                conn.close()
+                raise ValueError(f"Invalid table name: {name!r}")
+            # Built through the Python API, so names and paths never become SQL text
+            if feather is not None and has_fresh_sidecar(path):
+                table = feather.read_table(str(sidecar_path(path)), memory_map=True)
+                conn.register(name, table)
+            else:
+                conn.read_csv(path).create_view(name)
+
+        # CSV views are read at query time, so their files stay allowed
+        allowed = ", ".join("'" + path.replace("'", "''") + "'" for path in tables.values())
+        conn.execute(f"SET allowed_paths = [{allowed}]")
+        conn.execute("SET autoinstall_known_extensions = false")
+        conn.execute("SET autoload_known_extensions = false")
+        conn.execute("SET enable_external_access = false")
+        conn.execute("SET lock_configuration = true")
+        return conn
+
+    def execute(
+        self,
+        sql: str,
+        tables: Dict[str, str],
+        timeout: Optional[float] = None,
+        memory_bytes: Optional[int] = None,
+        cancelled: Optional[threading.Event] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run sql and return {"code", "success", "output", "error", "status"},
+        the same structure as Python executions. The output is the result
+        table as text, cut to max_result_rows.
+        """
+        result = {
+            "code": sql,
+            "language": "sql",
+            "success": False,
+            "output": "",
+            "error": None,
+            "status": "error",
+        }
+        if duckdb is None:
+            result["error"] = "SQL mode needs the duckdb package (pip install duckdb)"
+            return result
+
+        try:
+            conn = self.connect(tables, memory_bytes)
+        except (ValueError, duckdb.Error) as e:
+            result["error"] = str(e)
+            return result
+        timed_out = threading.Event()
+
+        def interrupt():
+            timed_out.set()
+            conn.interrupt()
+
+        timer = threading.Timer(timeout, interrupt) if timeout else None
+        watcher = None
+        if cancelled is not None:
+            # Stop the query as soon as the caller gives up on it
+            done = threading.Event()
+
+            def watch():
+                while not done.wait(0.05):
+                    if cancelled.is_set():
+                        conn.interrupt()
+                        return
+
+            watcher = threading.Thread(target=watch, daemon=True)
+            watcher.start()
+
+        try:
+            if timer is not None:
+                timer.start()
+            relation = conn.sql(sql)
+            if relation is not None:
+                df = relation.limit(self.max_result_rows + 1).df()
+                output = df.head(self.max_result_rows).to_string()
+                if len(df) > self.max_result_rows:
+                    output += f"\n[more than {self.max_result_rows} rows; showing the first {self.max_result_rows}]"
+                result["output"] = output + "\n"
+            result["success"] = True
+            result["status"] = "ok"
+        except duckdb.InterruptException:
+            if timed_out.is_set():
+                result["status"] = "timeout"
+                result["error"] = f"Query timed out after {timeout:g}s"
+            else:
+                result["status"] = "cancelled"
+                result["error"] = "Query was cancelled"
+        except duckdb.OutOfMemoryException as e:
+            result["status"] = "oom"
+            result["error"] = str(e)
+        except duckdb.Error as e:
+            result["error"] = str(e)
+        finally:
+            if timer is not None:
+                timer.cancel()
+            if watcher is not None:
+                done.set()
+            conn.close()
+
+        return result
@@ -0,0 +1,103 @@
+"""
+Token Budget - Keeps prompts under a fixed size
+
+Prompts are assembled from named sections with a priority. When the
+whole prompt would go over the budget, required sections are kept as
+they are, then the remaining budget is handed out by priority (lower
+number = more important). A section that doesn't fit is cut in the
+middle, keeping its head and tail.
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Dict, List
+
+
+# Rough average for English text and code; good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def truncate_middle(text: str, max_tokens: int) -> str:
+    """Keep the head and tail of text within max_tokens, eliding the middle"""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    if max_chars <= 0:
+        return ""
+
+    # Reserve room for the marker line inserted in the middle
+    keep = max(max_chars - 48, 0)
+    head_chars = keep * 2 // 3
+    tail_chars = keep - head_chars
+
+    head = text[:head_chars]
+    tail = text[len(text) - tail_chars:] if tail_chars else ""
+    # Prefer cutting at line boundaries so tables stay readable
+    if "\n" in head:
+        head = head.rsplit("\n", 1)[0]
+    if "\n" in tail:
+        tail = tail.split("\n", 1)[1]
+    omitted = len(text) - len(head) - len(tail)
+    return f"{head}\n... [{omitted} characters omitted] ...\n{tail}"
+
+
+@dataclass
+class PromptSection:
+    name: str
+    text: str
+    priority: int = 1
+    required: bool = False
+
+
+class TokenBudget:
+    """Builds a prompt from sections without going over max_tokens"""
+
+    def __init__(self, max_tokens: int):
+        self.max_tokens = max_tokens
+        self.sections: List[PromptSection] = []
+        self.report: Dict[str, Dict[str, int]] = {}
+
+    def add(self, name: str, text: str, priority: int = 1, required: bool = False):
+        self.sections.append(PromptSection(name, text, priority, required))
+
+    def render(self) -> str:
+        allowance = self._allocate()
+        parts = []
+        self.report = {}
+        for index, section in enumerate(self.sections):
+            text = truncate_middle(section.text, allowance[index])
+            self.report[section.name] = {
+                "tokens": estimate_tokens(section.text),
+                "kept_tokens": estimate_tokens(text),
+            }
+            parts.append(text)
+        return "".join(parts)
+
+    def _allocate(self) -> List[int]:
+        sizes = [estimate_tokens(section.text) for section in self.sections]
+        allowance = [0] * len(self.sections)
+        remaining = self.max_tokens
+
+        for index, section in enumerate(self.sections):
+            if section.required:
+                allowance[index] = sizes[index]
+                remaining -= sizes[index]
+
+        for priority in sorted({s.priority for s in self.sections if not s.required}):
+            group = [
+                index
+                for index, section in enumerate(self.sections)
+                if not section.required and section.priority == priority
+            ]
+            # Water-filling: small sections get everything they need and
+            # the rest share what's left evenly
+            for position, index in enumerate(sorted(group, key=lambda i: sizes[i])):
+                share = max(remaining, 0) // (len(group) - position)
+                allowance[index] = min(sizes[index], share)
+                remaining -= allowance[index]
+
+        return allowance
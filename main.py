@@ -3,23 +3,41 @@ Multi-Agent System API
 Simple FastAPI server for the multi-agent system
 """
 
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import BackgroundTasks, FastAPI, UploadFile, File, Form, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Set, Tuple
+import json
 import os
-import shutil
+import re
+from contextlib import asynccontextmanager
 from pathlib import Path
+import asyncio
 import uuid
 from datetime import datetime
 
 from agents.orchestrator import AgentOrchestrator
+from agents.dataframe_cache import dataframe_cache
+from agents.columnar import remove_sidecar, write_sidecar
+from session_store import create_session_store
+from upload_store import UploadStore
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start agent resources (e.g. code-execution workers) before serving
+    orchestrator.startup()
+    sweeper = asyncio.create_task(sweep_sessions(SESSION_SWEEP_SECONDS))
+    yield
+    sweeper.cancel()
+    orchestrator.shutdown()
+
 
 app = FastAPI(
     title="Multi-Agent System API",
     description="A simple multi-agent system for data analysis",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -38,11 +56,57 @@ orchestrator = AgentOrchestrator(api_key=GEMINI_API_KEY)
 
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
+uploads = UploadStore(UPLOAD_DIR)
 
+# Rendered charts, named by content hash (written by the DataVisualizer)
 VIZ_DIR = Path("visualizations")
 VIZ_DIR.mkdir(exist_ok=True)
-
-sessions: Dict[str, Dict[str, Any]] = {}
+PLOT_NAME = re.compile(r"^([0-9a-f]{64})\.(png|svg|jpg)$")
+PLOT_MEDIA_TYPES = {"png": "image/png", "svg": "image/svg+xml", "jpg": "image/jpeg"}
+
+
+def cleanup_session(session_id: str, session: Dict[str, Any]):
+    """Release a session's uploaded files and orchestrator context"""
+    for removed_path in uploads.release_session(session_id):
+        dataframe_cache.invalidate(str(removed_path))
+        remove_sidecar(str(removed_path))
+    orchestrator.end_session(session_id)
+
+
+def stale_sessions() -> List[str]:
+    """Sessions this process holds state for that are gone from the store"""
+    return [
+        session_id
+        for session_id in orchestrator.active_sessions()
+        if session_id not in sessions
+    ]
+
+
+async def sweep_sessions(interval: float):
+    """
+    Release this process's state for sessions another worker evicted.
+    on_evict only runs in the worker that evicts a session.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            for session_id in await asyncio.to_thread(stale_sessions):
+                orchestrator.end_session(session_id)
+        except Exception as e:
+            print(f"Warning: session sweep failed ({str(e)})")
+
+
+# SESSION_BACKEND=sqlite keeps sessions across restarts and shares them
+# between uvicorn workers
+sessions = create_session_store(
+    os.getenv("SESSION_BACKEND", "memory"),
+    path=os.getenv("SESSION_DB_PATH", "sessions.db"),
+    ttl=float(os.getenv("SESSION_TTL_SECONDS", "3600")),
+    max_bytes=int(os.getenv("SESSION_MAX_BYTES", str(256 * 1024 * 1024))),
+    on_evict=cleanup_session,
+)
+# How often each worker drops state for sessions evicted elsewhere
+SESSION_SWEEP_SECONDS = float(os.getenv("SESSION_SWEEP_SECONDS", "60"))
 
 
 class ChatRequest(BaseModel):
@@ -81,39 +145,48 @@ async def list_agents():
     return agents_info
 
 
+def record_results(
+    session_id: str,
+    message: str,
+    results: Dict[str, Any],
+    filename: Optional[str] = None,
+):
+    """Store agent results in the session context and history"""
+    if results["success"] and results.get("agent_results"):
+        sessions.update_context(
+            session_id,
+            {
+                f"{agent_name.lower()}_data": agent_result["data"]
+                for agent_name, agent_result in results["agent_results"].items()
+            },
+        )
+
+    entry = {
+        "timestamp": datetime.now().isoformat(),
+        "message": message,
+        "results": results,
+    }
+    if filename:
+        entry["file"] = filename
+    sessions.append_history(session_id, entry)
+
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     """Chat endpoint - process natural language queries"""
     try:
         session_id = request.session_id or str(uuid.uuid4())
+        session = sessions.get_or_create(session_id)
 
-        if session_id not in sessions:
-            sessions[session_id] = {
-                "created_at": datetime.now().isoformat(),
-                "context": {},
-                "history": [],
-            }
-
-        session = sessions[session_id]
-
-        files = session.get("uploaded_files", None)
+        files = session.get("uploaded_files") or None
         results = await orchestrator.chat(
             message=request.message,
             files=files,
             conversation_context=session["context"],
+            session_id=session_id,
         )
 
-        if results["success"] and results.get("agent_results"):
-            for agent_name, agent_result in results["agent_results"].items():
-                session["context"][f"{agent_name.lower()}_data"] = agent_result["data"]
-
-        session["history"].append(
-            {
-                "timestamp": datetime.now().isoformat(),
-                "message": request.message,
-                "results": results,
-            }
-        )
+        record_results(session_id, request.message, results)
 
         return ChatResponse(
             success=results["success"],
@@ -126,8 +199,44 @@ async def chat(request: ChatRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Streaming chat endpoint (Server-Sent Events).
+
+    Events: session, route, agent_start, agent_end, code_output, plot,
+    answer_token, and finally result (the same payload /chat returns
+    in "response") or error.
+    """
+    session_id = request.session_id or str(uuid.uuid4())
+    session = sessions.get_or_create(session_id)
+
+    async def event_stream():
+        yield format_sse("session", {"session_id": session_id})
+        async for item in orchestrator.stream_chat(
+            message=request.message,
+            files=session.get("uploaded_files") or None,
+            conversation_context=session["context"],
+            session_id=session_id,
+        ):
+            if item["event"] == "result":
+                record_results(session_id, request.message, item["data"])
+            yield format_sse(item["event"], item["data"])
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def format_sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
 @app.post("/upload")
 async def upload_file(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     message: Optional[str] = Form(None),
     session_id: Optional[str] = Form(None),
@@ -138,24 +247,13 @@ async def upload_file(
             raise HTTPException(status_code=400, detail="Only CSV files are supported")
 
         session_id = session_id or str(uuid.uuid4())
+        session = sessions.get_or_create(session_id)
 
-        if session_id not in sessions:
-            sessions[session_id] = {
-                "created_at": datetime.now().isoformat(),
-                "context": {},
-                "history": [],
-                "uploaded_files": {},
-            }
-
-        session = sessions[session_id]
-
-        file_id = str(uuid.uuid4())
-        file_path = UPLOAD_DIR / f"{file_id}_{file.filename}"
-
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        content_hash, file_path, deduplicated = await uploads.save(file, session_id)
+        sessions.add_file(session_id, file.filename, str(file_path))
 
-        session["uploaded_files"][file.filename] = str(file_path)
+        # Columnar copy for fast reloads, written after the response is sent
+        background_tasks.add_task(convert_to_sidecar, str(file_path))
 
         if message:
             results = await orchestrator.chat(
@@ -165,25 +263,14 @@ async def upload_file(
                 session_id=session_id,
             )
 
-            if results["success"] and results.get("agent_results"):
-                for agent_name, agent_result in results["agent_results"].items():
-                    session["context"][f"{agent_name.lower()}_data"] = agent_result[
-                        "data"
-                    ]
-
-            session["history"].append(
-                {
-                    "timestamp": datetime.now().isoformat(),
-                    "message": message,
-                    "file": file.filename,
-                    "results": results,
-                }
-            )
+            record_results(session_id, message, results, filename=file.filename)
 
             return {
                 "success": True,
                 "session_id": session_id,
                 "file_uploaded": file.filename,
+                "content_hash": content_hash,
+                "deduplicated": deduplicated,
                 "response": results,
                 "timestamp": datetime.now().isoformat(),
             }
@@ -192,6 +279,8 @@ async def upload_file(
                 "success": True,
                 "session_id": session_id,
                 "file_uploaded": file.filename,
+                "content_hash": content_hash,
+                "deduplicated": deduplicated,
                 "message": "File uploaded successfully. Send a message to analyze it.",
                 "timestamp": datetime.now().isoformat(),
             }
@@ -200,36 +289,163 @@ async def upload_file(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+SESSION_FIELDS = {"created_at", "context", "uploaded_files", "history"}
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def parse_fields(fields: Optional[str]) -> Tuple[Optional[Set[str]], Optional[Set[str]]]:
+    """
+    Parse a fields= projection like "context,history.message,history.timestamp".
+    Returns (top-level fields, history entry fields); None means everything.
+    """
+    if not fields:
+        return None, None
+
+    top_fields: Set[str] = set()
+    entry_fields: Optional[Set[str]] = None
+    for field in fields.split(","):
+        field = field.strip()
+        if not field:
+            continue
+        name, _, sub_field = field.partition(".")
+        top_fields.add(name)
+        if sub_field:
+            entry_fields = (entry_fields or set()) | {sub_field}
+    return top_fields, entry_fields
+
+
+def project(entry: Dict[str, Any], entry_fields: Optional[Set[str]]) -> Dict[str, Any]:
+    """Keep only the requested keys of an entry (plus its seq cursor)"""
+    if entry_fields is None:
+        return entry
+    return {key: value for key, value in entry.items() if key in entry_fields or key == "seq"}
+
+
+def convert_to_sidecar(csv_path: str):
+    try:
+        write_sidecar(csv_path)
+    except Exception as e:
+        print(f"Warning: could not write columnar sidecar for {csv_path} ({str(e)})")
+
+
 @app.get("/session/{session_id}")
-async def get_session(session_id: str):
-    """Get session information"""
-    if session_id not in sessions:
+async def get_session(
+    session_id: str,
+    fields: Optional[str] = None,
+    cursor: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    since: Optional[str] = None,
+):
+    """
+    Get session information.
+
+    fields: comma separated projection, e.g. "context" or
+            "history.timestamp,history.message" (default: everything)
+    cursor: return history entries after this seq (use next_cursor)
+    limit:  maximum number of history entries
+    since:  only history entries with an ISO timestamp later than this
+    """
+    session = sessions.get(session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
-    return {"session_id": session_id, "session": sessions[session_id]}
+
+    top_fields, entry_fields = parse_fields(fields)
+    wanted = SESSION_FIELDS if top_fields is None else top_fields & SESSION_FIELDS
+
+    response_session = {key: value for key, value in session.items() if key in wanted}
+    next_cursor = None
+    if "history" in wanted:
+        # Fetch one extra entry to know whether there is another page
+        history = sessions.get_history(session_id, after=cursor, limit=limit + 1, since=since)
+        if len(history) > limit:
+            history = history[:limit]
+            next_cursor = history[-1]["seq"]
+        response_session["history"] = [project(entry, entry_fields) for entry in history]
+
+    return {
+        "session_id": session_id,
+        "session": response_session,
+        "size_bytes": sessions.session_size(session_id),
+        "next_cursor": next_cursor,
+    }
 
 
 @app.delete("/session/{session_id}")
 async def delete_session(session_id: str):
     """Delete a session"""
-    if session_id not in sessions:
+    session = sessions.delete(session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    session = sessions[session_id]
-    if "uploaded_files" in session:
-        for filename, filepath in session["uploaded_files"].items():
-            try:
-                Path(filepath).unlink()
-            except:
-                pass
-
-    del sessions[session_id]
+    cleanup_session(session_id, session)
     return {"success": True, "message": f"Session {session_id} deleted"}
 
 
+@app.get("/sessions/stats")
+async def get_session_stats():
+    """Get session store size and eviction metrics"""
+    return sessions.metrics()
+
+
 @app.get("/history")
-async def get_history():
-    """Get execution history"""
-    return {"history": orchestrator.get_execution_history()}
+async def get_history(
+    fields: Optional[str] = None,
+    cursor: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    since: Optional[str] = None,
+):
+    """
+    Get execution history.
+
+    Supports the same fields/cursor/limit/since parameters as
+    /session/{session_id}, applied to the execution entries.
+    """
+    history = orchestrator.get_execution_history(after=cursor, limit=limit + 1, since=since)
+    next_cursor = None
+    if len(history) > limit:
+        history = history[:limit]
+        next_cursor = history[-1]["seq"]
+
+    entry_fields = {field.strip() for field in fields.split(",")} if fields else None
+    return {
+        "history": [project(entry, entry_fields) for entry in history],
+        "next_cursor": next_cursor,
+    }
+
+
+@app.get("/plots/{filename}")
+async def get_plot(filename: str, request: Request):
+    """Serve a rendered chart; the name is its content hash, so it never changes"""
+    match = PLOT_NAME.match(filename)
+    path = VIZ_DIR / filename
+    if match is None or not path.is_file():
+        raise HTTPException(status_code=404, detail="Plot not found")
+
+    etag = f'"{match.group(1)}"'
+    headers = {"Cache-Control": "public, max-age=31536000, immutable", "ETag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=PLOT_MEDIA_TYPES[match.group(2)], headers=headers)
+
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Get DataFrame, LLM response and plot cache statistics"""
+    stats = {"dataframes": dataframe_cache.stats()}
+    code_interpreter = orchestrator.get_agent("CodeInterpreter")
+    if code_interpreter is not None and code_interpreter.response_cache is not None:
+        stats["llm_responses"] = code_interpreter.response_cache.stats()
+    visualizer = orchestrator.get_agent("DataVisualizer")
+    if visualizer is not None:
+        stats["plots"] = visualizer.plots.stats()
+    return stats
+
+
+@app.get("/routing/stats")
+async def get_routing_stats():
+    """Get routing counters (fast-path vs LLM router)"""
+    return orchestrator.get_routing_stats()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,545 @@
+"""
+Session Store - Bounded storage for API sessions
+
+Sessions expire after being idle for ttl seconds, and the least recently
+used sessions are evicted once the total estimated size goes over
+max_bytes. The on_evict callback lets the API clean up whatever else
+belongs to the session (uploaded files, orchestrator context).
+
+Two backends are available:
+- MemorySessionStore: in-process, lost on restart
+- SQLiteSessionStore: local SQLite file in WAL mode, shared by all
+  uvicorn workers on the box and kept across restarts
+"""
+
+import bisect
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+
+# Large payloads that are kept in the latest context but not in history
+# (inline plot images from before plots were saved as files)
+HEAVY_KEYS = ("plot_base64",)
+
+
+def estimate_size(obj: Any) -> int:
+    """Approximate size in bytes of a JSON-serialisable object"""
+    return len(json.dumps(obj, default=str))
+
+
+def _compact_data(data: Any) -> Any:
+    if isinstance(data, dict) and any(key in data for key in HEAVY_KEYS):
+        return {
+            key: {"omitted_bytes": len(value)} if key in HEAVY_KEYS else value
+            for key, value in data.items()
+        }
+    return data
+
+
+def compact_results(results: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of an orchestrator result with heavy payloads replaced by their size"""
+    compacted = dict(results)
+    compacted["agent_results"] = {
+        agent_name: {**agent_result, "data": _compact_data(agent_result.get("data"))}
+        for agent_name, agent_result in results.get("agent_results", {}).items()
+    }
+    compacted["final_result"] = _compact_data(results.get("final_result"))
+    return compacted
+
+
+def _prepare_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+    entry = dict(entry)
+    if "results" in entry:
+        entry["results"] = compact_results(entry["results"])
+    return entry
+
+
+def _new_session() -> Dict[str, Any]:
+    return {
+        "created_at": datetime.now().isoformat(),
+        "context": {},
+        "uploaded_files": {},
+    }
+
+
+class SessionBackend(ABC):
+    """
+    Interface shared by all session stores.
+
+    get()/get_or_create() return session metadata, context and
+    uploaded_files only. History is loaded separately (and lazily)
+    through get_history(), which pages by the entry's "seq" number.
+    """
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Get a session and mark it as recently used"""
+
+    @abstractmethod
+    def get_or_create(self, session_id: str) -> Dict[str, Any]:
+        pass
+
+    @abstractmethod
+    def update_context(self, session_id: str, updates: Dict[str, Any]):
+        pass
+
+    @abstractmethod
+    def add_file(self, session_id: str, filename: str, filepath: str):
+        pass
+
+    @abstractmethod
+    def append_history(self, session_id: str, entry: Dict[str, Any]):
+        pass
+
+    @abstractmethod
+    def get_history(
+        self,
+        session_id: str,
+        after: Optional[int] = None,
+        limit: Optional[int] = None,
+        since: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """History entries with seq > after and timestamp > since, oldest first"""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Remove a session without calling on_evict; returns the removed session"""
+
+    @abstractmethod
+    def session_size(self, session_id: str) -> int:
+        pass
+
+    @abstractmethod
+    def metrics(self) -> Dict[str, Any]:
+        pass
+
+    @abstractmethod
+    def evict_expired(self):
+        """Evict sessions that have been idle longer than ttl"""
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+
+class MemorySessionStore(SessionBackend):
+    """In-process session store with idle-TTL and max-bytes eviction"""
+
+    def __init__(
+        self,
+        ttl: float = 3600,
+        max_bytes: int = 256 * 1024 * 1024,
+        on_evict: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    ):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+
+        # Ordered by last access, least recent first
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._last_access: Dict[str, float] = {}
+        self._sizes: Dict[str, Dict[str, int]] = {}
+        self.total_bytes = 0
+        self.evictions = {"ttl": 0, "max_bytes": 0}
+
+    def __contains__(self, session_id: str) -> bool:
+        self.evict_expired()
+        return session_id in self._sessions
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        session = self._get(session_id)
+        if session is None:
+            return None
+        return {key: value for key, value in session.items() if key != "history"}
+
+    def get_or_create(self, session_id: str) -> Dict[str, Any]:
+        if self._get(session_id) is None:
+            self._sessions[session_id] = {**_new_session(), "history": []}
+            self._sizes[session_id] = {"context": 0, "files": 0, "history": 0}
+            self._touch(session_id)
+        return self.get(session_id)
+
+    def _get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        self.evict_expired()
+        session = self._sessions.get(session_id)
+        if session is not None:
+            self._touch(session_id)
+        return session
+
+    def update_context(self, session_id: str, updates: Dict[str, Any]):
+        self.get_or_create(session_id)
+        session = self._sessions[session_id]
+        session["context"].update(updates)
+        self._resize(session_id, "context", estimate_size(session["context"]))
+
+    def add_file(self, session_id: str, filename: str, filepath: str):
+        self.get_or_create(session_id)
+        session = self._sessions[session_id]
+        session["uploaded_files"][filename] = filepath
+        self._resize(session_id, "files", estimate_size(session["uploaded_files"]))
+
+    def append_history(self, session_id: str, entry: Dict[str, Any]):
+        self.get_or_create(session_id)
+        session = self._sessions[session_id]
+        entry = _prepare_entry(entry)
+        entry["seq"] = len(session["history"])
+        session["history"].append(entry)
+        sizes = self._sizes[session_id]
+        self._resize(session_id, "history", sizes["history"] + estimate_size(entry))
+
+    def get_history(
+        self,
+        session_id: str,
+        after: Optional[int] = None,
+        limit: Optional[int] = None,
+        since: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        session = self._get(session_id)
+        if session is None:
+            return []
+        history = session["history"]
+        start = after + 1 if after is not None else 0
+        if since is not None:
+            first_newer = bisect.bisect_right(
+                history, since, key=lambda entry: entry.get("timestamp", "")
+            )
+            start = max(start, first_newer)
+        end = start + limit if limit is not None else None
+        return history[start:end]
+
+    def delete(self, session_id: str) -> Optional[Dict[str, Any]]:
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self._last_access.pop(session_id, None)
+            self.total_bytes -= sum(self._sizes.pop(session_id).values())
+        return session
+
+    def session_size(self, session_id: str) -> int:
+        return sum(self._sizes.get(session_id, {}).values())
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._sessions),
+            "total_bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "evictions": dict(self.evictions),
+            "largest_sessions": sorted(
+                ((sid, self.session_size(sid)) for sid in self._sessions),
+                key=lambda item: item[1],
+                reverse=True,
+            )[:5],
+        }
+
+    def evict_expired(self):
+        cutoff = time.monotonic() - self.ttl
+        while self._sessions:
+            session_id = next(iter(self._sessions))
+            if self._last_access[session_id] >= cutoff:
+                break
+            self._evict(session_id, "ttl")
+
+    def _touch(self, session_id: str):
+        self._sessions.move_to_end(session_id)
+        self._last_access[session_id] = time.monotonic()
+
+    def _resize(self, session_id: str, part: str, size: int):
+        sizes = self._sizes[session_id]
+        self.total_bytes += size - sizes[part]
+        sizes[part] = size
+        self._enforce_max_bytes(keep=session_id)
+
+    def _enforce_max_bytes(self, keep: str):
+        for session_id in list(self._sessions):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if session_id != keep:
+                self._evict(session_id, "max_bytes")
+
+    def _evict(self, session_id: str, reason: str):
+        session = self.delete(session_id)
+        self.evictions[reason] += 1
+        if self.on_evict and session is not None:
+            self.on_evict(session_id, session)
+
+
+class SQLiteSessionStore(SessionBackend):
+    """
+    Session store backed by a local SQLite database in WAL mode.
+
+    Session metadata/context and history rows live in separate tables,
+    so reading a session never loads its history; get_history() pages
+    through it by seq. Several processes can share the same file.
+    """
+
+    def __init__(
+        self,
+        path: str = "sessions.db",
+        ttl: float = 3600,
+        max_bytes: int = 256 * 1024 * 1024,
+        on_evict: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                created_at TEXT NOT NULL,
+                last_access REAL NOT NULL,
+                context TEXT NOT NULL,
+                uploaded_files TEXT NOT NULL,
+                meta_bytes INTEGER NOT NULL DEFAULT 0,
+                history_bytes INTEGER NOT NULL DEFAULT 0,
+                history_count INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS sessions_last_access ON sessions (last_access);
+            CREATE TABLE IF NOT EXISTS history (
+                session_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                entry TEXT NOT NULL,
+                PRIMARY KEY (session_id, seq)
+            );
+            CREATE TABLE IF NOT EXISTS evictions (
+                reason TEXT PRIMARY KEY,
+                count INTEGER NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    def __contains__(self, session_id: str) -> bool:
+        # Unlike get(), doesn't count as an access
+        self.evict_expired()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return row is not None
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        self.evict_expired()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT created_at, context, uploaded_files FROM sessions WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE sessions SET last_access = ? WHERE session_id = ?",
+                (time.time(), session_id),
+            )
+        return {
+            "created_at": row["created_at"],
+            "context": json.loads(row["context"]),
+            "uploaded_files": json.loads(row["uploaded_files"]),
+        }
+
+    def get_or_create(self, session_id: str) -> Dict[str, Any]:
+        session = self.get(session_id)
+        if session is not None:
+            return session
+
+        session = _new_session()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO sessions "
+                "(session_id, created_at, last_access, context, uploaded_files) "
+                "VALUES (?, ?, ?, '{}', '{}')",
+                (session_id, session["created_at"], time.time()),
+            )
+        return self.get(session_id) or session
+
+    def update_context(self, session_id: str, updates: Dict[str, Any]):
+        self._merge_meta(session_id, "context", updates)
+
+    def add_file(self, session_id: str, filename: str, filepath: str):
+        self._merge_meta(session_id, "uploaded_files", {filename: filepath})
+
+    def append_history(self, session_id: str, entry: Dict[str, Any]):
+        self.get_or_create(session_id)
+        entry = _prepare_entry(entry)
+        with self._lock, self._conn:
+            seq = self._conn.execute(
+                "SELECT history_count FROM sessions WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()[0]
+            entry["seq"] = seq
+            encoded = json.dumps(entry, default=str)
+            self._conn.execute(
+                "INSERT INTO history (session_id, seq, entry) VALUES (?, ?, ?)",
+                (session_id, seq, encoded),
+            )
+            self._conn.execute(
+                "UPDATE sessions SET history_count = history_count + 1, "
+                "history_bytes = history_bytes + ?, last_access = ? WHERE session_id = ?",
+                (len(encoded), time.time(), session_id),
+            )
+        self._enforce_max_bytes(keep=session_id)
+
+    def get_history(
+        self,
+        session_id: str,
+        after: Optional[int] = None,
+        limit: Optional[int] = None,
+        since: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT entry FROM history WHERE session_id = ? AND seq > ? "
+                "AND json_extract(entry, '$.timestamp') > ? ORDER BY seq LIMIT ?",
+                (
+                    session_id,
+                    -1 if after is None else after,
+                    since or "",
+                    -1 if limit is None else limit,
+                ),
+            ).fetchall()
+        return [json.loads(row["entry"]) for row in rows]
+
+    def delete(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT created_at, context, uploaded_files FROM sessions WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM history WHERE session_id = ?", (session_id,))
+        return {
+            "created_at": row["created_at"],
+            "context": json.loads(row["context"]),
+            "uploaded_files": json.loads(row["uploaded_files"]),
+        }
+
+    def session_size(self, session_id: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT meta_bytes + history_bytes FROM sessions WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+        return row[0] if row else 0
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(meta_bytes + history_bytes), 0) FROM sessions"
+            ).fetchone()
+            largest = self._conn.execute(
+                "SELECT session_id, meta_bytes + history_bytes AS size FROM sessions "
+                "ORDER BY size DESC LIMIT 5"
+            ).fetchall()
+            evictions = dict(self._conn.execute("SELECT reason, count FROM evictions").fetchall())
+        return {
+            "sessions": count,
+            "total_bytes": total,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "evictions": {"ttl": evictions.get("ttl", 0), "max_bytes": evictions.get("max_bytes", 0)},
+            "largest_sessions": [[row[0], row[1]] for row in largest],
+        }
+
+    def evict_expired(self):
+        with self._lock:
+            expired = self._conn.execute(
+                "SELECT session_id FROM sessions WHERE last_access < ?",
+                (time.time() - self.ttl,),
+            ).fetchall()
+        for row in expired:
+            self._evict(row[0], "ttl")
+
+    def _merge_meta(self, session_id: str, column: str, updates: Dict[str, Any]):
+        """Merge updates into the context or uploaded_files of a session"""
+        # Read, merge and write in one write transaction, so a concurrent
+        # update from another worker process can't be overwritten
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO sessions "
+                    "(session_id, created_at, last_access, context, uploaded_files) "
+                    "VALUES (?, ?, ?, '{}', '{}')",
+                    (session_id, _new_session()["created_at"], time.time()),
+                )
+                row = self._conn.execute(
+                    "SELECT context, uploaded_files FROM sessions WHERE session_id = ?",
+                    (session_id,),
+                ).fetchone()
+                meta = {"context": row["context"], "uploaded_files": row["uploaded_files"]}
+                merged = json.loads(meta[column])
+                merged.update(updates)
+                meta[column] = json.dumps(merged, default=str)
+                self._conn.execute(
+                    "UPDATE sessions SET context = ?, uploaded_files = ?, meta_bytes = ?, "
+                    "last_access = ? WHERE session_id = ?",
+                    (
+                        meta["context"],
+                        meta["uploaded_files"],
+                        len(meta["context"]) + len(meta["uploaded_files"]),
+                        time.time(),
+                        session_id,
+                    ),
+                )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        self._enforce_max_bytes(keep=session_id)
+
+    def _enforce_max_bytes(self, keep: str):
+        with self._lock:
+            total = self._conn.execute(
+                "SELECT COALESCE(SUM(meta_bytes + history_bytes), 0) FROM sessions"
+            ).fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            candidates = self._conn.execute(
+                "SELECT session_id, meta_bytes + history_bytes FROM sessions "
+                "WHERE session_id != ? ORDER BY last_access",
+                (keep,),
+            ).fetchall()
+
+        for session_id, size in candidates:
+            if total <= self.max_bytes:
+                break
+            self._evict(session_id, "max_bytes")
+            total -= size
+
+    def _evict(self, session_id: str, reason: str):
+        session = self.delete(session_id)
+        if session is None:
+            # Another worker got there first
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO evictions (reason, count) VALUES (?, 1) "
+                "ON CONFLICT(reason) DO UPDATE SET count = count + 1",
+                (reason,),
+            )
+        if self.on_evict:
+            self.on_evict(session_id, session)
+
+
+def create_session_store(backend: str = "memory", **kwargs) -> SessionBackend:
+    """Create a session store by backend name ("memory" or "sqlite")"""
+    if backend == "memory":
+        kwargs.pop("path", None)
+        return MemorySessionStore(**kwargs)
+    if backend == "sqlite":
+        return SQLiteSessionStore(**kwargs)
+    raise ValueError(f"Unknown session backend: {backend}")
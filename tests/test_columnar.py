@@ -0,0 +1,18 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from agents.columnar import load_frame, write_sidecar
+
+
+def test_sidecar_matches_pandas_for_duplicate_headers(tmp_path):
+    csv_path = tmp_path / "dup.csv"
+    csv_path.write_text("a,a,b\n1,2,x\n3,4,y\n")
+
+    assert write_sidecar(str(csv_path)) is not None
+    frame = load_frame(str(csv_path))
+
+    expected = pd.read_csv(csv_path)
+    assert list(frame.columns) == ["a", "a.1", "b"]
+    pd.testing.assert_frame_equal(frame, expected)
@@ -0,0 +1,140 @@
+import numpy as np
+import pytest
+
+from agents.downsample import (
+    DownsampleConfig,
+    lttb_indices,
+    minmax_indices,
+    reduce_for_plot,
+    sample_chunks,
+    stride_indices,
+    sum_chunks,
+)
+
+
+CONFIG = DownsampleConfig(
+    line_max_points=100, scatter_max_points=100, scatter_bins=10, bar_max_categories=5
+)
+
+
+@pytest.mark.parametrize("plot_type", ["line", "scatter", "bar"])
+def test_empty_series_is_not_reduced(plot_type):
+    data, report = reduce_for_plot(np.array([]), np.array([]), plot_type, CONFIG)
+    assert report is None
+    assert len(data.x) == 0
+
+
+@pytest.mark.parametrize("plot_type", ["line", "scatter", "bar"])
+def test_series_at_the_limit_is_not_reduced(plot_type):
+    x = np.arange(5 if plot_type == "bar" else 100)
+    data, report = reduce_for_plot(x, x * 2.0, plot_type, CONFIG)
+    assert report is None
+    assert np.array_equal(data.x, x)
+
+
+@pytest.mark.parametrize("plot_type", ["line", "scatter"])
+@pytest.mark.parametrize("missing", ["x", "y"])
+def test_all_missing_values_fall_back_to_stride(plot_type, missing):
+    values = np.arange(1000, dtype="float64")
+    nan = np.full(1000, np.nan)
+    x, y = (nan, values) if missing == "x" else (values, nan)
+    data, report = reduce_for_plot(x, y, plot_type, CONFIG)
+    assert report["method"] == "stride"
+    assert report["output_points"] == len(data.x) <= 100
+
+
+def test_minmax_keeps_extremes_and_endpoints():
+    y = np.sin(np.linspace(0, 20, 10_000))
+    y[1234], y[5678] = 50.0, -50.0
+    keep = minmax_indices(y, 100)
+    assert len(keep) <= 100
+    assert {0, 1234, 5678, 9999} <= set(keep.tolist())
+    assert np.all(np.diff(keep) > 0)
+
+
+def test_minmax_without_points():
+    assert len(minmax_indices(np.array([]), 2000)) == 0
+    assert minmax_indices(np.array([3.0, 1.0]), 2000).tolist() == [0, 1]
+
+
+def test_lttb_selects_the_requested_points():
+    x = np.arange(10_000, dtype="float64")
+    y = np.random.default_rng(0).normal(size=10_000)
+    keep = lttb_indices(x, y, 100)
+    assert len(keep) == 100
+    assert keep[0] == 0 and keep[-1] == 9999
+    assert np.all(np.diff(keep) > 0)
+    assert len(lttb_indices(np.array([]), np.array([]), 100)) == 0
+
+
+def test_line_reduction_skips_missing_points():
+    y = np.arange(1000, dtype="float64")
+    y[::3] = np.nan
+    data, report = reduce_for_plot(np.arange(1000), y, "line", CONFIG)
+    assert report["method"] == "minmax"
+    assert not np.isnan(data.y).any()
+
+
+def test_non_numeric_line_is_strided():
+    x = np.arange(1000)
+    y = np.array([f"v{i}" for i in range(1000)], dtype=object)
+    data, report = reduce_for_plot(x, y, "line", CONFIG)
+    assert report["method"] == "stride"
+    assert data.x[0] == 0 and data.x[-1] == 999
+
+
+def test_scatter_becomes_a_density_grid():
+    rng = np.random.default_rng(1)
+    data, report = reduce_for_plot(rng.normal(size=5000), rng.normal(size=5000), "scatter", CONFIG)
+    counts, x_edges, y_edges = data.density
+    assert report["method"] == "hist2d"
+    assert counts.shape == (10, 10)
+    assert counts.sum() == 5000
+
+
+def test_bar_keeps_top_categories_and_sums_the_rest():
+    x = np.array(list("abcdefgh") * 2, dtype=object)
+    y = np.array([8, 7, 6, 5, 4, 3, 2, 1] * 2, dtype="float64")
+    data, report = reduce_for_plot(x, y, "bar", CONFIG)
+    assert report["method"] == "top_n"
+    assert report["input_categories"] == 8
+    assert data.x.tolist() == ["a", "b", "c", "d", "Other"]
+    assert data.y.tolist() == [16, 14, 12, 10, 20]
+
+
+def test_stride_indices_cover_both_ends():
+    keep = stride_indices(1000, 10)
+    assert keep[0] == 0 and keep[-1] == 999
+    assert len(keep) == 10
+
+
+def chunked(n, size):
+    for start in range(0, n, size):
+        values = np.arange(start, min(start + size, n))
+        yield values, values * 2
+
+
+def test_sample_chunks_is_bounded_and_evenly_spaced():
+    x, y, seen = sample_chunks(chunked(100_000, 777), 1000)
+    assert seen == 100_000
+    assert len(x) <= 1000
+    assert x[0] == 0
+    assert len(set(np.diff(x).tolist())) == 1
+    assert np.array_equal(y, x * 2)
+
+
+def test_sample_chunks_keeps_small_inputs_whole():
+    x, _, seen = sample_chunks(chunked(50, 7), 1000)
+    assert x.tolist() == list(range(50))
+    assert seen == 50
+    assert sample_chunks(iter(()), 10)[2] == 0
+
+
+def test_sum_chunks_totals_across_chunks():
+    chunks = [
+        (np.array(["a", "b"], dtype=object), np.array([1.0, 2.0])),
+        (np.array(["b", "c"], dtype=object), np.array([3.0, 4.0])),
+    ]
+    x, y, seen = sum_chunks(chunks)
+    assert dict(zip(x.tolist(), y.tolist())) == {"a": 1.0, "b": 5.0, "c": 4.0}
+    assert seen == 4
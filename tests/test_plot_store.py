@@ -0,0 +1,94 @@
+import itertools
+
+import pytest
+
+from agents import plot_store
+from agents.plot_renderer import RenderedPlot
+from agents.plot_store import PlotStore, render_key
+
+
+class FakeClock:
+    """Strictly increasing time, so access order is unambiguous"""
+
+    def __init__(self):
+        self._ticks = itertools.count(1)
+
+    def time(self):
+        return float(next(self._ticks))
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    monkeypatch.setattr(plot_store, "time", FakeClock())
+
+
+def plot(content: bytes, reduction=None) -> RenderedPlot:
+    return RenderedPlot(content, "png", 800, 500, reduction=reduction)
+
+
+def test_save_and_lookup(tmp_path):
+    store = PlotStore(tmp_path, url_prefix="/plots/")
+    key = render_key("data", "x", "y", "line")
+    reduction = {"method": "minmax", "input_points": 10, "output_points": 4, "threshold": 4}
+    saved = store.save(plot(b"image", reduction), key)
+
+    assert saved["plot_url"] == f"/plots/{saved['plot_hash']}.png"
+    assert (tmp_path / f"{saved['plot_hash']}.png").read_bytes() == b"image"
+    found = store.lookup(key)
+    assert found == saved
+    assert found["reduction"] == reduction
+    assert store.lookup(render_key("other")) is None
+    assert (store.hits, store.misses) == (1, 1)
+
+
+def test_render_key_depends_on_every_part():
+    assert render_key("data", "line") == render_key("data", "line")
+    assert render_key("data", "line") != render_key("data", "bar")
+
+
+def test_identical_images_share_a_file(tmp_path):
+    store = PlotStore(tmp_path)
+    first = store.save(plot(b"same"), "k1")
+    second = store.save(plot(b"same"), "k2")
+
+    assert first["plot_url"] == second["plot_url"]
+    assert store.stats()["files"] == 1
+    assert store.lookup("k1") is not None and store.lookup("k2") is not None
+
+
+def test_least_recently_used_file_is_evicted(tmp_path):
+    store = PlotStore(tmp_path, max_bytes=25)
+    old = store.save(plot(b"a" * 10), "old")
+    used = store.save(plot(b"b" * 10), "used")
+    store.lookup("old")  # "used" is now the least recently used
+    store.save(plot(b"c" * 10), "new")
+
+    assert store.lookup("used") is None
+    assert not (tmp_path / used["plot_url"].rsplit("/", 1)[1]).exists()
+    assert store.lookup("old") == {**old, "reduction": None}
+    assert store.lookup("new") is not None
+    assert store.stats()["evictions"] == 1
+    assert store.stats()["total_bytes"] == 20
+
+
+def test_new_file_is_kept_even_if_over_budget(tmp_path):
+    store = PlotStore(tmp_path, max_bytes=5)
+    store.save(plot(b"a" * 10), "first")
+    store.save(plot(b"b" * 10), "second")
+
+    assert store.lookup("first") is None
+    assert store.lookup("second") is not None
+    assert store.stats()["files"] == 1
+
+
+def test_missing_file_is_a_miss(tmp_path):
+    store = PlotStore(tmp_path)
+    saved = store.save(plot(b"image"), "k")
+    (tmp_path / saved["plot_url"].rsplit("/", 1)[1]).unlink()
+
+    assert store.lookup("k") is None
+
+
+def test_index_survives_a_restart(tmp_path):
+    PlotStore(tmp_path).save(plot(b"image"), "k")
+    assert PlotStore(tmp_path).lookup("k") is not None
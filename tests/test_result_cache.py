@@ -0,0 +1,103 @@
+import pandas as pd
+import pytest
+
+from agents.code_cache import CompileCache, ResultCache, is_deterministic, is_deterministic_sql
+from agents.code_interpreter import CodeInterpreterAgent, LoadedFrame
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    monkeypatch.setenv("LLM_BACKEND", "stub")
+    monkeypatch.setenv("LLM_CACHE_PATH", "off")
+    return CodeInterpreterAgent("test-key", result_cache_size=16)
+
+
+@pytest.fixture
+def files(tmp_path):
+    x, y = tmp_path / "x.csv", tmp_path / "y.csv"
+    pd.DataFrame({"v": [1, 2]}).to_csv(x, index=False)
+    pd.DataFrame({"v": [10, 20, 30]}).to_csv(y, index=False)
+    return str(x), str(y)
+
+
+def frames(**paths):
+    return {name: LoadedFrame(name, f"{name}.csv", path, None, None) for name, path in paths.items()}
+
+
+def test_key_ignores_input_order():
+    first = ResultCache.key("print(a)", [("a", ("x", 1, 1)), ("b", ("y", 2, 2))])
+    second = ResultCache.key("print(a)", [("b", ("y", 2, 2)), ("a", ("x", 1, 1))])
+    assert first == second
+
+
+def test_result_cache_round_trip():
+    cache = ResultCache(maxsize=2)
+    key = ResultCache.key("print(1)", [])
+    assert cache.get(key) is None
+    cache.set(key, {"output": "1\n"})
+    assert cache.get(key) == {"output": "1\n"}
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 1}
+
+
+def test_swapped_bindings_get_different_keys(agent, files):
+    x, y = files
+    first = agent._result_cache_key("print(a.mean())", frames(a=x, b=y))
+    second = agent._result_cache_key("print(a.mean())", frames(a=y, b=x))
+    assert first is not None and second is not None
+    assert first != second
+
+
+def test_key_only_covers_referenced_frames(agent, files):
+    x, y = files
+    only_a = agent._result_cache_key("print(a.mean())", frames(a=x))
+    with_b = agent._result_cache_key("print(a.mean())", frames(a=x, b=y))
+    assert only_a == with_b
+
+
+def test_filename_alias_is_keyed_by_filename(agent, files):
+    x, y = files
+    code = "print(len(sales))"
+    aliased = {"b": LoadedFrame("b", "sales", x, None, None)}
+    swapped = {"b": LoadedFrame("b", "sales", y, None, None)}
+    key = agent._result_cache_key(code, aliased)
+    assert [name for name, _ in key[1]] == ["sales"]
+    assert key != agent._result_cache_key(code, swapped)
+
+
+def test_key_changes_when_the_file_changes(agent, files):
+    x, _ = files
+    before = agent._result_cache_key("print(a.sum())", frames(a=x))
+    pd.DataFrame({"v": [1, 2, 3, 4]}).to_csv(x, index=False)
+    after = agent._result_cache_key("print(a.sum())", frames(a=x))
+    assert before != after
+
+
+def test_sql_keys_use_table_bindings(agent, files):
+    x, y = files
+    agent.language = "sql"
+    first = agent._result_cache_key("SELECT avg(v) FROM a", frames(a=x, b=y))
+    second = agent._result_cache_key("SELECT avg(v) FROM a", frames(a=y, b=x))
+    assert first != second
+
+
+def test_nondeterministic_code_is_not_cached(agent, files):
+    x, _ = files
+    assert agent._result_cache_key("import random\nprint(random.random())", frames(a=x)) is None
+    assert agent._result_cache_key("print(a.sample(1))", frames(a=x)) is None
+    assert agent._result_cache_key("print(", frames(a=x)) is None
+
+
+def test_determinism_checks():
+    assert is_deterministic("print(df.groupby('a').sum())")
+    assert not is_deterministic("import time\nprint(time.time())")
+    assert is_deterministic_sql("SELECT a, sum(b) FROM t GROUP BY a")
+    assert not is_deterministic_sql("SELECT * FROM read_csv_auto('/etc/passwd')")
+    assert not is_deterministic_sql("SELECT random()")
+
+
+def test_compile_cache_reuses_code_objects():
+    cache = CompileCache(maxsize=4)
+    first, hit_first = cache.compile("x = 1")
+    second, hit_second = cache.compile("x = 1")
+    assert first is second
+    assert (hit_first, hit_second) == (False, True)
@@ -0,0 +1,61 @@
+import threading
+
+from session_store import SQLiteSessionStore
+
+
+def test_updates_from_two_workers_are_all_kept(tmp_path):
+    # Two stores on one file stand in for two uvicorn worker processes
+    path = str(tmp_path / "sessions.db")
+    stores = [SQLiteSessionStore(path), SQLiteSessionStore(path)]
+    stores[0].get_or_create("s")
+
+    def upload(store, worker):
+        for i in range(25):
+            store.add_file("s", f"file-{worker}-{i}.csv", f"/uploads/{worker}-{i}.csv")
+
+    def chat(store, worker):
+        for i in range(25):
+            store.update_context("s", {f"key-{worker}-{i}": i})
+
+    threads = [
+        threading.Thread(target=upload, args=(stores[0], 0)),
+        threading.Thread(target=chat, args=(stores[1], 1)),
+        threading.Thread(target=upload, args=(stores[1], 1)),
+        threading.Thread(target=chat, args=(stores[0], 0)),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    session = stores[0].get("s")
+    assert len(session["uploaded_files"]) == 50
+    assert len(session["context"]) == 50
+
+
+def test_update_creates_missing_session(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    store.update_context("new", {"a": 1})
+    store.update_context("new", {"b": 2})
+    store.add_file("new", "data.csv", "/uploads/data.csv")
+
+    session = store.get("new")
+    assert session["context"] == {"a": 1, "b": 2}
+    assert session["uploaded_files"] == {"data.csv": "/uploads/data.csv"}
+    assert store.session_size("new") > 0
+
+
+def test_membership_sees_other_workers_without_touching(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    worker, other = SQLiteSessionStore(path), SQLiteSessionStore(path)
+    worker.get_or_create("s")
+    last_access = lambda: worker._conn.execute(
+        "SELECT last_access FROM sessions WHERE session_id = 's'"
+    ).fetchone()[0]
+    before = last_access()
+
+    assert "s" in worker
+    assert last_access() == before
+
+    other.delete("s")
+    assert "s" not in worker
@@ -0,0 +1,65 @@
+import pandas as pd
+import pytest
+
+from agents.code_interpreter import safe_variable_name
+from agents.sql_engine import TABLE_NAME, SQLEngine
+
+duckdb = pytest.importorskip("duckdb")
+
+
+@pytest.fixture
+def sales(tmp_path):
+    path = tmp_path / "sales.csv"
+    pd.DataFrame({"region": ["EU", "US", "EU"], "amount": [1, 2, 3]}).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.mark.parametrize(
+    "filename",
+    [
+        "sales.csv",
+        "my data-2024.csv",
+        "2024.csv",
+        'x"\tAS\tSELECT\t1;COPY(SELECT\t42)TO\'pwned.txt\';CREATE\tVIEW\t"z.csv',
+        "ümlaut (copy).csv",
+        ".csv",
+    ],
+)
+def test_variable_names_are_identifiers(filename):
+    assert TABLE_NAME.fullmatch(safe_variable_name(filename))
+
+
+def test_query_runs_against_a_csv_view(sales):
+    result = SQLEngine().execute(
+        "SELECT region, sum(amount) AS total FROM sales GROUP BY region ORDER BY region",
+        {"sales": sales},
+    )
+    assert result["status"] == "ok"
+    assert "EU" in result["output"] and "4" in result["output"]
+
+
+def test_hostile_table_name_is_rejected(sales, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    name = 'x"\tAS\tSELECT\t1;COPY(SELECT\t42)TO\'pwned.txt\';CREATE\tVIEW\t"z'
+    result = SQLEngine().execute("SELECT 1", {name: sales})
+
+    assert result["status"] == "error"
+    assert "Invalid table name" in result["error"]
+    assert not (tmp_path / "pwned.txt").exists()
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "COPY (SELECT 42) TO '{out}'",
+        "SELECT * FROM read_text('/etc/hostname')",
+        "ATTACH '{db}'",
+        "SET enable_external_access = true",
+    ],
+)
+def test_generated_sql_cannot_reach_outside_files(sales, tmp_path, sql):
+    out, db = tmp_path / "out.csv", tmp_path / "other.db"
+    result = SQLEngine().execute(sql.format(out=out, db=db), {"sales": sales})
+
+    assert result["status"] == "error"
+    assert not out.exists() and not db.exists()
@@ -0,0 +1,65 @@
+import asyncio
+import io
+
+from fastapi import UploadFile
+
+from upload_store import UploadStore
+
+
+def save(store, data: bytes, session_id: str, filename: str = "data.csv"):
+    upload = UploadFile(file=io.BytesIO(data), filename=filename)
+    return asyncio.run(store.save(upload, session_id))
+
+
+def test_same_content_is_stored_once(tmp_path):
+    store = UploadStore(tmp_path, chunk_size=4)
+    digest_a, path_a, existed_a = save(store, b"a,b\n1,2\n", "s1")
+    digest_b, path_b, existed_b = save(store, b"a,b\n1,2\n", "s2", filename="other.CSV")
+
+    assert digest_a == digest_b
+    assert path_a == path_b
+    assert path_a.name == f"{digest_a}.csv"
+    assert (existed_a, existed_b) == (False, True)
+    assert path_a.read_bytes() == b"a,b\n1,2\n"
+    assert store.ref_count(digest_a) == 2
+
+
+def test_session_references_a_blob_once(tmp_path):
+    store = UploadStore(tmp_path)
+    digest, _, _ = save(store, b"x\n1\n", "s1")
+    save(store, b"x\n1\n", "s1")
+
+    assert store.ref_count(digest) == 1
+
+
+def test_blob_deleted_with_its_last_reference(tmp_path):
+    store = UploadStore(tmp_path)
+    digest, path, _ = save(store, b"x\n1\n", "s1")
+    save(store, b"x\n1\n", "s2")
+
+    assert store.release_session("s1") == []
+    assert path.exists()
+    assert store.ref_count(digest) == 1
+
+    assert store.release_session("s2") == [path]
+    assert not path.exists()
+    assert store.ref_count(digest) == 0
+
+
+def test_release_keeps_other_sessions_blobs(tmp_path):
+    store = UploadStore(tmp_path)
+    _, shared, _ = save(store, b"shared\n", "s1")
+    _, own, _ = save(store, b"own\n", "s1")
+    save(store, b"shared\n", "s2")
+
+    assert store.release_session("s1") == [own]
+    assert shared.exists()
+    assert store.release_session("unknown") == []
+
+
+def test_no_temp_files_left_behind(tmp_path):
+    store = UploadStore(tmp_path, chunk_size=2)
+    save(store, b"a,b\n1,2\n3,4\n", "s1")
+    save(store, b"a,b\n1,2\n3,4\n", "s2")
+
+    assert not list(tmp_path.glob(".upload-*"))
@@ -0,0 +1,129 @@
+"""
+Upload Store - Content-addressed storage for uploaded files
+
+Uploads are streamed to disk in chunks while being hashed, then stored
+as uploads/<sha256><ext>. Uploading the same file again (from any
+session) reuses the existing blob. Each session holds a reference to the
+blobs it uses; a blob is deleted once no session references it.
+
+References live in a small SQLite database next to the blobs so several
+uvicorn workers can share one upload directory.
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import uuid
+from pathlib import Path
+from typing import List, Tuple
+
+from fastapi import UploadFile
+
+
+class UploadStore:
+    """Deduplicating upload storage with per-session reference counting"""
+
+    def __init__(self, root: Path, chunk_size: int = 1024 * 1024):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(
+            str(self.root / "refs.db"),
+            check_same_thread=False,
+            timeout=30,
+            isolation_level=None,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS refs ("
+            "digest TEXT NOT NULL, "
+            "path TEXT NOT NULL, "
+            "session_id TEXT NOT NULL, "
+            "PRIMARY KEY (digest, session_id))"
+        )
+
+    async def save(self, upload: UploadFile, session_id: str) -> Tuple[str, Path, bool]:
+        """
+        Stream an upload to disk and reference it from a session.
+        Returns (content hash, blob path, whether the blob already existed).
+        """
+        suffix = Path(upload.filename or "").suffix.lower()
+        temp_path = self.root / f".upload-{uuid.uuid4().hex}.tmp"
+        hasher = hashlib.sha256()
+
+        try:
+            with open(temp_path, "wb") as out:
+                while True:
+                    chunk = await upload.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    # hashlib and file writes release the GIL for large buffers
+                    await asyncio.to_thread(self._absorb, out, hasher, chunk)
+
+            digest = hasher.hexdigest()
+            blob_path = self.root / f"{digest}{suffix}"
+            existed = await asyncio.to_thread(
+                self._commit, digest, blob_path, temp_path, session_id
+            )
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
+
+        return digest, blob_path, existed
+
+    def release_session(self, session_id: str) -> List[Path]:
+        """Drop a session's references; returns the blobs that were deleted"""
+        removed = []
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT digest, path FROM refs WHERE session_id = ?", (session_id,)
+                ).fetchall()
+                self._conn.execute("DELETE FROM refs WHERE session_id = ?", (session_id,))
+                for digest, path in rows:
+                    still_used = self._conn.execute(
+                        "SELECT 1 FROM refs WHERE digest = ? LIMIT 1", (digest,)
+                    ).fetchone()
+                    if not still_used:
+                        Path(path).unlink(missing_ok=True)
+                        removed.append(Path(path))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return removed
+
+    def ref_count(self, digest: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM refs WHERE digest = ?", (digest,)
+            ).fetchone()[0]
+
+    @staticmethod
+    def _absorb(out, hasher, chunk: bytes):
+        hasher.update(chunk)
+        out.write(chunk)
+
+    def _commit(self, digest: str, blob_path: Path, temp_path: Path, session_id: str) -> bool:
+        # Reference + move happen in one write transaction so a concurrent
+        # release_session() can't delete the blob in between
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO refs (digest, path, session_id) VALUES (?, ?, ?)",
+                    (digest, str(blob_path), session_id),
+                )
+                existed = blob_path.exists()
+                if not existed:
+                    os.replace(temp_path, blob_path)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return existed